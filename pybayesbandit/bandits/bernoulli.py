@@ -15,14 +15,16 @@
 
 
 from pybayesbandit.bandits import Bandit
+from pybayesbandit.rng import default_source
 
 import numpy as np
 
 
 class BernoulliBandit(Bandit):
 
-    def __init__(self, probs):
-        self._probs = probs
+    def __init__(self, probs, rng=None):
+        self._probs = np.asarray(probs, dtype=np.float64)
+        self.rng = rng if rng is not None else default_source()
         self._optimal = np.max(probs)
 
     @property
@@ -30,12 +32,13 @@ class BernoulliBandit(Bandit):
         return len(self._probs)
 
     def __call__(self, action):
-        assert 0 <= action < self.size
-        return np.random.binomial(1, self._probs[action])
+        '''Pulls an arm, or one arm per episode if `action` is an array.'''
+        assert np.all((0 <= action) & (action < self.size))
+        return self.rng.bernoulli(self._probs[action])
 
     def regret(self, action):
         return self._optimal - self._probs[action]
 
     def total_regret(self, actions):
         T = len(actions)
-        return T * self._optimal - np.sum(self._probs[a] for a in actions)
+        return T * self._optimal - np.sum(self._probs[np.asarray(actions, dtype=np.int64)])
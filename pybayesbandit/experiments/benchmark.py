@@ -0,0 +1,213 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners import Learner
+from pybayesbandit.registry import BANDITS, GAMES, LEARNERS
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import multiprocessing
+import numpy as np
+import platform
+import resource
+import time
+
+
+UCTParams = namedtuple('Params', 'trials maxdepth C deadline', defaults=[None])
+AOTreeParams = namedtuple('Params', 'maxdepth deadline', defaults=[None])
+
+# preset name: (registered learner, params)
+PRESETS = {
+    'UCB1': ('ucb', None),
+    'TS': ('thompson', None),
+    'AOTree(depth=1)': ('aotree', AOTreeParams(maxdepth=1)),
+    'AOTree(depth=2)': ('aotree', AOTreeParams(maxdepth=2)),
+    'AOTree(depth=3)': ('aotree', AOTreeParams(maxdepth=3)),
+    'UCT(trials=64, depth=3, C=10)': ('uct', UCTParams(trials=64, maxdepth=3, C=10)),
+    'UCT(trials=256, depth=4, C=10)': ('uct', UCTParams(trials=256, maxdepth=4, C=10)),
+    'AOTree(deadline=1ms)': ('aotree', AOTreeParams(maxdepth=10, deadline=1)),
+    'UCT(deadline=1ms, depth=4, C=10)': ('uct', UCTParams(trials=None, maxdepth=4, C=10, deadline=1)),
+}
+
+# metric: direction in which the metric gets worse
+METRICS = {
+    'decisions_per_sec': -1,
+    'p50_ms': 1,
+    'p99_ms': 1,
+    'peak_rss_mb': 1,
+}
+
+
+Scenario = namedtuple('Scenario', 'learner K delta T N game')
+
+
+def scenario_name(scenario):
+    return '{}/K={}/delta={}/T={}/N={}/{}'.format(*scenario)
+
+
+def scenarios(learners, Ks, deltas, Ts, N, game='total'):
+    '''Returns the learner x K x delta x T grid of scenarios.'''
+    return [Scenario(*key, N=N, game=game) for key in itertools.product(learners, Ks, deltas, Ts)]
+
+
+class TimedLearner(Learner):
+    '''Wraps a learner and records the latency of each decision.'''
+
+    def __init__(self, learner):
+        self.learner = learner
+        self.latencies = []
+
+    def __call__(self):
+        start = time.perf_counter()
+        action = self.learner()
+        self.latencies.append(time.perf_counter() - start)
+        return action
+
+    def update(self, action, reward):
+        self.learner.update(action, reward)
+
+    def reset(self):
+        self.learner.reset()
+
+
+def run_scenario(scenario, seed=None):
+    '''
+    Plays one scenario in the current process and returns its metrics.
+    Peak RSS is the peak of the whole process, so scenarios should run in
+    fresh processes (see `run`).
+    '''
+    name, params = PRESETS[scenario.learner]
+    probs = [0.5] * (scenario.K - 1) + [0.5 + scenario.delta]
+    bandit = BANDITS['bernoulli'](probs)
+    learner = TimedLearner(LEARNERS[name](bandit.size, scenario.T, params))
+    game = GAMES[scenario.game](bandit, learner)
+
+    start = time.perf_counter()
+    results = game.run(scenario.N, scenario.T, seed=seed)
+    seconds = time.perf_counter() - start
+
+    if scenario.game == 'total':
+        regrets = results[1]
+        regret, regret_std, curve = float(regrets[0][-1]), float(regrets[1][-1]), regrets[0].tolist()
+    else:
+        regret, regret_std, curve = float(results[0]), float(results[1]), None
+
+    latencies = np.array(learner.latencies) * 1000
+    return {
+        'scenario': scenario._asdict(),
+        'decisions': len(latencies),
+        'seconds': seconds,
+        'decisions_per_sec': len(latencies) / sum(learner.latencies),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'regret': regret,
+        'regret_std': regret_std,
+        'regret_curve': curve,
+    }
+
+
+def run(scenarios, seed=0, verbose=False):
+    '''
+    Runs each scenario in a fresh spawned process and returns the results
+    keyed by scenario name.
+    '''
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for scenario in scenarios:
+        name = scenario_name(scenario)
+        if verbose:
+            print('{} ... '.format(name), end='', flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[name] = executor.submit(run_scenario, scenario, seed).result()
+        if verbose:
+            print('{decisions_per_sec:10.1f} decisions/sec  p50 {p50_ms:.3f} ms  p99 {p99_ms:.3f} ms  '
+                  '{peak_rss_mb:.1f} MB  regret {regret:.4f}'.format(**results[name]))
+    return results
+
+
+def save(results, filename, seed=0):
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+    with open(filename, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+def load(filename):
+    with open(filename) as file:
+        return json.load(file)['results']
+
+
+def compare(results, baseline, tolerance=0.1):
+    '''
+    Returns a list of (scenario, metric, baseline, current) regressions.
+
+    Throughput, latency and memory regress when they get worse by more than
+    `tolerance` (relative). Regret regresses when it grows by more than two
+    standard errors of the difference of the two runs.
+    '''
+    regressions = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        for metric, worse in METRICS.items():
+            if worse * (current[metric] - base[metric]) > tolerance * abs(base[metric]):
+                regressions.append((name, metric, base[metric], current[metric]))
+        N = current['scenario']['N']
+        stderr = np.sqrt((current['regret_std'] ** 2 + base['regret_std'] ** 2) / N)
+        if current['regret'] - base['regret'] > 2 * stderr:
+            regressions.append((name, 'regret', base['regret'], current['regret']))
+    return regressions
+
+
+def plot(results, filename):
+    '''Plots the regret of each learner per (K, delta, T) to a PDF file.'''
+    import matplotlib.pyplot as plt
+
+    panels = {}
+    for name, result in results.items():
+        scenario = result['scenario']
+        key = (scenario['K'], scenario['delta'], scenario['T'], scenario['game'])
+        panels.setdefault(key, []).append(result)
+
+    fig = plt.figure(figsize=(10 * min(len(panels), 2), 5 * ((len(panels) + 1) // 2)))
+    for i, ((K, delta, T, game), panel) in enumerate(sorted(panels.items()), 1):
+        fig.add_subplot((len(panels) + 1) // 2, min(len(panels), 2), i)
+        if game == 'total':
+            for result in panel:
+                plt.plot(range(1, T + 1), result['regret_curve'], label=result['scenario']['learner'])
+            plt.title('Cumulative Regret ($K={}, \\Delta={}$)'.format(K, delta), fontweight='bold')
+            plt.xlabel('rounds (t)')
+            plt.legend()
+            plt.grid()
+        else:
+            plt.bar([result['scenario']['learner'] for result in panel], [result['regret'] for result in panel], 0.35,
+                alpha=0.4, color='b', yerr=[result['regret_std'] for result in panel], error_kw={'ecolor': '0.3'})
+            plt.title('Simple Regret ($K={}, \\Delta={}$)'.format(K, delta), fontweight='bold')
+            plt.xlabel('learner')
+            plt.grid(axis='y')
+        plt.tight_layout()
+    plt.savefig(filename, format='pdf')
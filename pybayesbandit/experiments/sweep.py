@@ -0,0 +1,145 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+import pybayesbandit
+from pybayesbandit.registry import BANDITS, GAMES, LEARNERS
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import itertools
+import json
+import os
+import types
+
+
+Job = namedtuple('Job', 'bandit learner params game N T seed')
+
+
+def expand(bandits, learners, games, sizes, seed=0):
+    '''
+    Returns one job per cell of the bandits x learners x games x sizes
+    grid. `bandits` are lists of Bernoulli probabilities, `learners` are
+    (name, params) pairs and `sizes` are (N, T) pairs.
+    '''
+    return [
+        Job(tuple(probs), name, dict(params or {}), game, N, T, seed)
+        for probs, (name, params), game, (N, T) in itertools.product(bandits, learners, games, sizes)
+    ]
+
+
+def load(filename):
+    '''
+    Expands the JSON sweep grid in `filename`, with "bandits", "learners"
+    (objects with "name" and optional "params"), "games", "sizes" and
+    "seed" keys.
+    '''
+    with open(filename) as file:
+        config = json.load(file)
+    learners = [(learner['name'], learner.get('params')) for learner in config['learners']]
+    return expand(config['bandits'], learners, config.get('games', ['total']),
+        config['sizes'], config.get('seed', 0))
+
+
+def job_key(job):
+    '''Hashes the full configuration of a job, seed and package version.'''
+    config = dict(job._asdict(), version=pybayesbandit.__version__)
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def make_game(job):
+    bandit = BANDITS['bernoulli'](job.bandit)
+    learner = LEARNERS[job.learner](bandit.size, job.T, types.SimpleNamespace(**job.params))
+    return GAMES[job.game](bandit, learner)
+
+
+def run_job(job):
+    game = make_game(job)
+    return to_json(job, game.run(job.N, job.T, seed=job.seed))
+
+
+def to_json(job, results):
+    '''Converts the output of `Game.run` for `job` to plain JSON types.'''
+    if job.game == 'total':
+        (avg_rewards, std_rewards), (avg_regrets, std_regrets) = results
+        return {
+            'rewards': {'mean': avg_rewards.tolist(), 'std': std_rewards.tolist()},
+            'regrets': {'mean': avg_regrets.tolist(), 'std': std_regrets.tolist()},
+        }
+    avg_regret, std_regret = results
+    return {'regret': {'mean': float(avg_regret), 'std': float(std_regret)}}
+
+
+class ResultCache():
+    '''
+    Directory of job results in JSON files named by `job_key`.
+
+    Results are written to a temporary file and renamed into place, so an
+    interrupted sweep never leaves a partial result behind.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _filename(self, key):
+        return os.path.join(self.path, key[:2], key + '.json')
+
+    def __contains__(self, key):
+        return os.path.exists(self._filename(key))
+
+    def get(self, key):
+        filename = self._filename(key)
+        if not os.path.exists(filename):
+            return None
+        with open(filename) as file:
+            return json.load(file)['result']
+
+    def put(self, key, job, result):
+        filename = self._filename(key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp, 'w') as file:
+            json.dump({'job': job._asdict(), 'result': result}, file)
+        os.replace(tmp, filename)
+
+
+def run(jobs, cache, workers=1, verbose=False):
+    '''
+    Runs the jobs missing from `cache` on a pool of `workers` processes,
+    storing each result as soon as it finishes, and returns the results of
+    all jobs in order.
+    '''
+    keys = [job_key(job) for job in jobs]
+    missing = {key: job for key, job in zip(keys, jobs) if key not in cache}
+    if verbose:
+        print('{} jobs, {} cached, {} to run'.format(len(jobs), len(jobs) - len(missing), len(missing)))
+
+    if workers == 1:
+        for key, job in missing.items():
+            cache.put(key, job, run_job(job))
+            if verbose:
+                print('done {}'.format(key[:12]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, job): key for key, job in missing.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                cache.put(key, missing[key], future.result())
+                if verbose:
+                    print('done {}'.format(key[:12]))
+
+    return [cache.get(key) for key in keys]
@@ -0,0 +1,232 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.experiments.sweep import Job, job_key, make_game, to_json
+from pybayesbandit.registry import GAMES
+
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+
+
+class WorkQueue():
+    '''
+    Episode shards of sweep jobs in a directory shared by all workers.
+
+    Shard descriptors move through pending/, running/ and done/. A worker
+    claims a shard by renaming it from pending/<name> to a name of its own,
+    running/<name>.<claim time>-<pid>-<random>, which succeeds for exactly
+    one worker. It stores the shard's running statistics in results/
+    (written to a temporary file and renamed into place) and completes the
+    shard by moving its own claim to done/<name>.
+
+    While a shard runs its claim's mtime is refreshed (see `work`), and
+    `requeue` returns claims that have been neither claimed nor refreshed
+    for a while to pending/. A worker whose claim was requeued finds its
+    claim gone on completion and leaves the shard to whoever claims it
+    next. Only a shared filesystem with atomic renames is needed.
+    '''
+
+    STATES = ['pending', 'running', 'done', 'results']
+
+    def __init__(self, path):
+        self.path = path
+        for state in self.STATES:
+            os.makedirs(os.path.join(path, state), exist_ok=True)
+
+    def _filename(self, state, name):
+        return os.path.join(self.path, state, name)
+
+    def _names(self, state):
+        return [name for name in os.listdir(os.path.join(self.path, state)) if not name.startswith('.')]
+
+    @staticmethod
+    def _shard(claim):
+        '''Returns the shard name of a claim.'''
+        return claim.rsplit('.', 1)[0]
+
+    @staticmethod
+    def _claimed_at(claim):
+        return int(claim.rsplit('.', 1)[1].split('-')[0], 16) / 1e9
+
+    def submit(self, jobs, shards=1):
+        '''
+        Splits the episodes of each job into `shards` contiguous shards and
+        queues those not queued yet. Returns the number of new shards.
+        '''
+        queued = set(self._names('pending')) | set(self._names('done'))
+        queued |= {self._shard(claim) for claim in self._names('running')}
+        submitted = 0
+        for job in jobs:
+            key = job_key(job)
+            shards_ = min(shards, job.N)
+            for i in range(shards_):
+                name = '{}-{:04d}.json'.format(key, i)
+                if name in queued:
+                    continue
+                descriptor = {
+                    'key': key,
+                    'job': job._asdict(),
+                    'shard': [i * job.N // shards_, (i + 1) * job.N // shards_],
+                    'shards': shards_,
+                }
+                tmp = self._filename('pending', '.{}.{}.tmp'.format(name, os.getpid()))
+                with open(tmp, 'w') as file:
+                    json.dump(descriptor, file)
+                os.replace(tmp, self._filename('pending', name))
+                submitted += 1
+        return submitted
+
+    def claim(self):
+        '''Moves one pending shard to running/ and returns its (claim, descriptor).'''
+        for name in sorted(self._names('pending')):
+            claim = '{}.{:x}-{}-{}'.format(name, time.time_ns(), os.getpid(), uuid.uuid4().hex)
+            try:
+                os.rename(self._filename('pending', name), self._filename('running', claim))
+                with open(self._filename('running', claim)) as file:
+                    return claim, json.load(file)
+            except FileNotFoundError: # claimed by another worker, or requeued already
+                continue
+        return None
+
+    def heartbeat(self, claim):
+        '''Marks a claim as alive. Returns False if it is no longer held.'''
+        try:
+            os.utime(self._filename('running', claim))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def complete(self, claim, stats):
+        '''
+        Stores the statistics of a claimed shard and moves the claim to
+        done/. Returns False if the claim was requeued meanwhile, in which
+        case the shard stays queued (its results are those of the shard, so
+        whoever completes it writes the same ones).
+        '''
+        name = self._shard(claim)
+        filename = self._filename('results', name[:-len('.json')] + '.pkl')
+        tmp = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp, 'wb') as file:
+            pickle.dump(stats, file)
+        os.replace(tmp, filename)
+        try:
+            os.rename(self._filename('running', claim), self._filename('done', name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def requeue(self, timeout):
+        '''
+        Returns shards claimed and last refreshed more than `timeout` seconds
+        ago to pending/. The timeout must be well above the heartbeat
+        interval of the workers.
+        '''
+        requeued = 0
+        now = time.time()
+        for claim in self._names('running'):
+            filename = self._filename('running', claim)
+            try:
+                alive = max(self._claimed_at(claim), os.path.getmtime(filename))
+                if now - alive > timeout:
+                    os.rename(filename, self._filename('pending', self._shard(claim)))
+                    requeued += 1
+            except FileNotFoundError: # completed or requeued meanwhile
+                continue
+        return requeued
+
+    def status(self):
+        return {state: len(self._names(state)) for state in self.STATES[:3]}
+
+    def reduce(self):
+        '''
+        Merges the shard statistics of every job whose shards are all done
+        and returns a list of (job, result) pairs, with results as in
+        `sweep.run`.
+        '''
+        jobs = {}
+        for name in sorted(self._names('done')):
+            with open(self._filename('done', name)) as file:
+                descriptor = json.load(file)
+            jobs.setdefault(descriptor['key'], []).append((name, descriptor))
+
+        results = []
+        for key, shards in jobs.items():
+            descriptor = shards[0][1]
+            if len(shards) < descriptor['shards']:
+                continue
+            merged = None
+            for name, _ in shards:
+                with open(self._filename('results', name[:-len('.json')] + '.pkl'), 'rb') as file:
+                    stats = pickle.load(file)
+                if merged is None:
+                    merged = stats
+                else:
+                    for total, shard in zip(merged, stats):
+                        if total is not None:
+                            total.merge(shard)
+            job = Job(**dict(descriptor['job'], bandit=tuple(descriptor['job']['bandit'])))
+            results.append((job, to_json(job, GAMES[job.game].summarize(*merged))))
+        return results
+
+
+def run_shard(descriptor):
+    '''Plays the episodes of one shard and returns their running statistics.'''
+    job = Job(**dict(descriptor['job'], bandit=tuple(descriptor['job']['bandit'])))
+    game = make_game(job)
+    episodes = game.episodes(job.N, job.T, job.seed, shard=descriptor['shard'])
+    return game.accumulate(episodes, job.T)
+
+
+def _beat(queue, claim, interval, stop):
+    while not stop.wait(interval):
+        if not queue.heartbeat(claim):
+            return
+
+
+def work(path, wait=0.0, poll=1.0, verbose=False, heartbeat=60.0):
+    '''
+    Runs shards from the queue at `path` until none has been pending for
+    `wait` seconds, refreshing the claim of the running shard every
+    `heartbeat` seconds. Returns the number of shards completed.
+    '''
+    queue = WorkQueue(path)
+    completed = 0
+    idle = time.time()
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            if time.time() - idle >= wait:
+                return completed
+            time.sleep(poll)
+            continue
+        claim, descriptor = claimed
+        stop = threading.Event()
+        beat = threading.Thread(target=_beat, args=(queue, claim, heartbeat, stop), daemon=True)
+        beat.start()
+        try:
+            stats = run_shard(descriptor)
+        finally:
+            stop.set()
+            beat.join()
+        if queue.complete(claim, stats):
+            completed += 1
+        idle = time.time()
+        if verbose:
+            print('[{}] done {}'.format(os.getpid(), queue._shard(claim)))
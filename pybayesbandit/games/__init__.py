@@ -14,7 +14,28 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 
+from concurrent.futures import ProcessPoolExecutor
+from pybayesbandit import rng
+
 import abc
+import numpy as np
+
+
+# maximum number of values per result array held for a group of episodes
+CHUNK_CELLS = 2**22
+
+
+def episode_seeds(seed, N):
+    '''Derives one independent seed per episode from a single game seed.'''
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(N)]
+
+
+def _play(game, T, seeds):
+    results = []
+    for seed in seeds:
+        rng.reseed(seed)
+        results.append(game.episode(T))
+    return results
 
 
 class Game(metaclass=abc.ABCMeta):
@@ -27,6 +48,76 @@ class Game(metaclass=abc.ABCMeta):
     def episode(self, T):
         raise NotImplementedError
 
-    @abc.abstractmethod
-    def run(self, N, T):
-        raise NotImplementedError
+    def episodes(self, N, T, seed=None, workers=1, shard=None):
+        '''
+        Plays N episodes and yields their results in order.
+
+        When a seed is given or the episodes are sharded over `workers`
+        processes, the default random source is reseeded at the start of
+        each episode from `episode_seeds` (see `rng.reseed`), so results
+        for a fixed seed do not depend on the number of workers. Shards
+        hold at most CHUNK_CELLS values per result array.
+
+        Given a seed, `shard` = (start, stop) plays only those episodes of
+        the N, so disjoint shards can be played anywhere and merged.
+        '''
+        if seed is None and workers == 1:
+            assert shard is None, 'sharded episodes require a seed'
+            for n in range(N):
+                yield self.episode(T)
+            return
+
+        if seed is None:
+            seed = rng.default_source().integer(2**31)
+        seeds = episode_seeds(seed, N)
+        if shard is not None:
+            seeds = seeds[shard[0]:shard[1]]
+        N = len(seeds)
+
+        if workers == 1:
+            for seed in seeds:
+                rng.reseed(seed)
+                yield self.episode(T)
+            return
+
+        size = max(1, min(-(-N // workers), CHUNK_CELLS // T))
+        shards = [seeds[i:i + size] for i in range(0, N, size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(_play, [self] * len(shards), [T] * len(shards), shards):
+                yield from results
+
+    def batches(self, N, T, seed=None):
+        '''
+        Plays N episodes in lockstep and yields the results of consecutive
+        groups of at most CHUNK_CELLS // T episodes.
+        '''
+        if seed is not None:
+            rng.reseed(seed)
+        size = max(1, CHUNK_CELLS // T)
+        for i in range(0, N, size):
+            yield self.batch_episode(min(size, N - i), T)
+
+    def batch_episode(self, N, T):
+        '''Plays N episodes in lockstep with `Learner.batch` and returns their results.'''
+        raise NotImplementedError('{} does not support batched episodes'.format(type(self).__name__))
+
+    @classmethod
+    def accumulate(cls, results, T, quantiles=None):
+        '''Folds episode results into running statistics that merge across shards.'''
+        raise NotImplementedError('{} does not accumulate statistics'.format(cls.__name__))
+
+    @classmethod
+    def summarize(cls, *stats):
+        '''Returns the results of the game from its merged running statistics.'''
+        raise NotImplementedError('{} does not summarize statistics'.format(cls.__name__))
+
+    def run(self, N, T, batch=False, seed=None, workers=1, quantiles=None):
+        '''
+        Plays N episodes, in lockstep if `batch`, and returns the summary
+        statistics of the game, accumulated as episodes finish.
+        '''
+        if batch:
+            results = self.batches(N, T, seed)
+        else:
+            results = self.episodes(N, T, seed, workers)
+        return self.summarize(*self.accumulate(results, T, quantiles))
@@ -14,6 +14,7 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 from pybayesbandit.games import Game
+from pybayesbandit.games.stats import RunningStats, QuantileSketch
 
 import numpy as np
 
@@ -36,14 +37,44 @@ class SimpleRegretGame(Game):
 
         return regret
 
-    def run(self, N, T):
-        simple_regrets = np.zeros([N], dtype=np.float32)
+    def batch_episode(self, N, T):
+        learner = self.learner.batch(N)
+        learner.reset()
 
-        for n in range(N):
-            regret = self.episode(T)
-            simple_regrets[n] = regret
-
-        avg_simple_regrets = np.mean(simple_regrets, axis=0)
-        std_simple_regrets = np.std(simple_regrets, axis=0)
-
-        return (avg_simple_regrets, std_simple_regrets)
+        for t in range(T-1):
+            a = learner()
+            r = self.bandit(a)
+            learner.update(a, r)
+
+        a = learner()
+        regrets = self.bandit.regret(a)
+
+        return regrets
+
+    @classmethod
+    def accumulate(cls, results, T, quantiles=None):
+        '''
+        Folds the simple regrets of single episodes or lockstep groups into
+        running statistics and, given `quantiles`, a quantile sketch.
+        '''
+        stats = RunningStats()
+        sketch = QuantileSketch(quantiles) if quantiles is not None else None
+
+        for regrets in results:
+            regrets = np.asarray(regrets, dtype=np.float32)
+            stats.push(regrets)
+            if sketch is not None:
+                sketch.push(regrets)
+
+        return stats, sketch
+
+    @classmethod
+    def summarize(cls, stats, sketch=None):
+        '''Returns the mean and std of the simple regret and its quantiles.'''
+        avg_simple_regrets = np.float32(stats.mean)
+        std_simple_regrets = np.float32(stats.std)
+
+        results = (avg_simple_regrets, std_simple_regrets)
+        if sketch is not None:
+            results += (sketch.quantiles.astype(np.float32),)
+        return results
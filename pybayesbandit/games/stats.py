@@ -0,0 +1,135 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+
+class RunningStats():
+    '''
+    Running mean and (population) standard deviation of a stream of arrays
+    of a fixed shape, e.g. one cumulative-regret curve per episode.
+
+    Batches are folded in with the pairwise update of Chan et al., in
+    float64, so memory does not depend on the number of episodes.
+    '''
+
+    def __init__(self, shape=()):
+        self.n = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def push(self, x):
+        '''Adds one observation, or a batch of them stacked on axis 0.'''
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == self.mean.ndim:
+            x = x[np.newaxis]
+        mean = np.mean(x, axis=0)
+        m2 = np.sum(np.square(x - mean), axis=0)
+        self._merge(len(x), mean, m2)
+
+    def merge(self, other):
+        '''Folds in the observations of another RunningStats.'''
+        self._merge(other.n, other.mean, other._m2)
+
+    def _merge(self, n, mean, m2):
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self._m2 = self._m2 + m2 + np.square(delta) * (self.n * n / total)
+        self.n = total
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / max(self.n, 1))
+
+
+class QuantileSketch():
+    '''
+    Streaming estimates of the `probs` quantiles of every entry of a stream
+    of arrays of a fixed shape, with the P-square algorithm of Jain and
+    Chlamtac (1985).
+
+    Each (quantile, entry) pair keeps 5 markers whose heights are adjusted
+    with piecewise-parabolic interpolation as observations arrive; all
+    pairs are updated at once with array arithmetic.
+    '''
+
+    def __init__(self, probs, shape=()):
+        self.probs = np.asarray(probs, dtype=np.float64)
+        self.shape = shape
+        self.n = 0
+        self._first = []
+
+        p = self.probs[:, np.newaxis]
+        extra = (1,) * len(shape)
+        self._rates = np.hstack([0 * p, p / 2, p, (1 + p) / 2, 0 * p + 1]).reshape((len(p), 5) + extra)
+        self._desired = np.hstack([0 * p, 2 * p, 4 * p, 2 + 2 * p, 0 * p + 4]).reshape((len(p), 5) + extra)
+        self._markers = np.arange(5, dtype=np.float64).reshape((1, 5) + extra)
+        self._heights = None
+
+    def push(self, x):
+        '''Adds one observation, or a batch of them stacked on axis 0.'''
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == len(self.shape):
+            x = x[np.newaxis]
+        for row in x:
+            self._push(row)
+
+    def _push(self, x):
+        self.n += 1
+        if self._heights is None:
+            self._first.append(x)
+            if len(self._first) == 5:
+                heights = np.sort(np.stack(self._first), axis=0)
+                self._heights = np.repeat(heights[np.newaxis], len(self.probs), axis=0)
+                self._markers = np.broadcast_to(self._markers, self._heights.shape).copy()
+                self._first = []
+            return
+
+        q, n = self._heights, self._markers
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        cell = np.sum(x >= q[:, 1:4], axis=1)
+        n += np.arange(5).reshape((1, 5) + (1,) * len(self.shape)) > cell[:, np.newaxis]
+        self._desired = self._desired + self._rates
+
+        for i in range(1, 4):
+            d = self._desired[:, i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((d <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            if not np.any(move):
+                continue
+            d = np.where(move, np.sign(d), 0.0)
+            parabolic = q[:, i] + d / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + d) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - d) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+            neighbour = np.where(d > 0, i + 1, i - 1)
+            qn = np.take_along_axis(q, neighbour[:, np.newaxis], axis=1)[:, 0]
+            nn = np.take_along_axis(n, neighbour[:, np.newaxis], axis=1)[:, 0]
+            linear = q[:, i] + d * (qn - q[:, i]) / (nn - n[:, i])
+            inside = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+            q[:, i] = np.where(move, np.where(inside, parabolic, linear), q[:, i])
+            n[:, i] += d
+
+    @property
+    def quantiles(self):
+        '''Returns an array with one estimate per quantile and entry.'''
+        if self._heights is None:
+            if not self._first:
+                return np.full((len(self.probs),) + tuple(self.shape), np.nan)
+            return np.quantile(np.stack(self._first), self.probs, axis=0)
+        return self._heights[:, 2].copy()
@@ -14,6 +14,7 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 from pybayesbandit.games import Game
+from pybayesbandit.games.stats import RunningStats, QuantileSketch
 
 import numpy as np
 
@@ -41,19 +42,59 @@ class TotalRegretGame(Game):
 
         return actions, rewards, regrets
 
-    def run(self, N, T):
-        total_rewards = np.zeros([N, T], dtype=np.float32)
-        total_regrets = np.zeros([N, T], dtype=np.float32)
+    def batch_episode(self, N, T):
+        learner = self.learner.batch(N)
+        learner.reset()
 
-        for n in range(N):
-            actions, rewards, regrets = self.episode(T)
-            total_rewards[n] = np.cumsum(rewards, axis=0)
-            total_regrets[n] = np.cumsum(regrets, axis=0)
+        actions = np.zeros([N, T], dtype=np.float32)
+        rewards = np.zeros([N, T], dtype=np.float32)
+        regrets = np.zeros([N, T], dtype=np.float32)
 
-        avg_total_rewards = np.mean(total_rewards, axis=0)
-        std_total_rewards = np.std(total_rewards, axis=0)
+        for t in range(T):
+            a = learner()
+            r = self.bandit(a)
+            learner.update(a, r)
 
-        avg_total_regrets = np.mean(total_regrets, axis=0)
-        std_total_regrets = np.std(total_regrets, axis=0)
+            actions[:, t] = a
+            rewards[:, t] = r
+            regrets[:, t] = self.bandit.regret(a)
+
+        return actions, rewards, regrets
 
-        return (avg_total_rewards, std_total_rewards), (avg_total_regrets, std_total_regrets)
+    @classmethod
+    def accumulate(cls, results, T, quantiles=None):
+        '''
+        Folds the (actions, rewards, regrets) of single episodes or
+        lockstep groups into running statistics of the cumulative rewards
+        and regrets and, given `quantiles`, a regret quantile sketch.
+        '''
+        reward_stats = RunningStats((T,))
+        regret_stats = RunningStats((T,))
+        regret_sketch = QuantileSketch(quantiles, (T,)) if quantiles is not None else None
+
+        for _, rewards, regrets in results:
+            total_regrets = np.cumsum(regrets, axis=-1)
+            reward_stats.push(np.cumsum(rewards, axis=-1))
+            regret_stats.push(total_regrets)
+            if regret_sketch is not None:
+                regret_sketch.push(total_regrets)
+
+        return reward_stats, regret_stats, regret_sketch
+
+    @classmethod
+    def summarize(cls, reward_stats, regret_stats, regret_sketch=None):
+        '''
+        Returns the per-round mean and std of the cumulative rewards and
+        regrets and, given a sketch, the per-round quantile curves of the
+        cumulative regret.
+        '''
+        avg_total_rewards = reward_stats.mean.astype(np.float32)
+        std_total_rewards = reward_stats.std.astype(np.float32)
+
+        avg_total_regrets = regret_stats.mean.astype(np.float32)
+        std_total_regrets = regret_stats.std.astype(np.float32)
+
+        results = (avg_total_rewards, std_total_rewards), (avg_total_regrets, std_total_regrets)
+        if regret_sketch is not None:
+            results += (regret_sketch.quantiles.astype(np.float32),)
+        return results
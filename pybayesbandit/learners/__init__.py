@@ -19,10 +19,51 @@ import abc
 
 class Learner(metaclass=abc.ABCMeta):
 
+    # number of actions returned by `act` whose reward has not arrived yet
+    _pending = 0
+
     @abc.abstractmethod
     def __call__(self):
         raise NotImplemented
 
+    def act(self):
+        '''
+        Returns the next action, like __call__, when its reward may arrive
+        later, after further decisions. Any number of actions can be
+        pending: decisions use the posterior of the rewards received so
+        far, and learners that plan over the remaining horizon count pending
+        actions as steps already taken, and raise ValueError once no step
+        is left. Each reward that arrives afterwards through `update` or
+        `update_batch` resolves one pending action.
+        '''
+        return self()
+
+    def update_batch(self, actions, rewards):
+        '''
+        Applies many observations at once. The posterior does not depend on
+        their order; subclasses accumulate counts vectorized where they can.
+        '''
+        for action, reward in zip(actions, rewards):
+            self.update(action, reward)
+
+    def _check_horizon(self, steps):
+        '''Raises if `act` has no step of the horizon left, counting pending actions.'''
+        if steps <= 0:
+            raise ValueError('{} has no steps left in its horizon ({} actions pending)'.format(
+                type(self).__name__, self._pending))
+
+    def _check_observations(self, steps, n):
+        '''Raises if n observations exceed the horizon left, where pending actions count as steps.'''
+        if n > steps + self._pending:
+            raise ValueError('{} observations exceed the {} steps left in the horizon of {}'.format(
+                n, steps + self._pending, type(self).__name__))
+
+    def _resolve(self, n):
+        '''Resolves up to n pending actions and returns the number of the n observations left.'''
+        resolved = min(n, self._pending)
+        self._pending -= resolved
+        return n - resolved
+
     @abc.abstractmethod
     def update(self, action, reward):
         raise NotImplemented
@@ -30,3 +71,39 @@ class Learner(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def reset(self):
         raise NotImplemented
+
+    def batch(self, N):
+        '''Returns N independent copies of this learner advanced in lockstep.'''
+        raise NotImplementedError('{} does not support batched episodes'.format(type(self).__name__))
+
+    @classmethod
+    def act_many(cls, learners):
+        '''
+        Returns the next action of each of `learners`, independent instances
+        of this class over the same number of actions, with the exception
+        raised by a learner in place of its action. Subclasses vectorize it
+        over the learners where they can.
+        '''
+        actions = []
+        for learner in learners:
+            try:
+                actions.append(learner.act())
+            except Exception as error:
+                actions.append(error)
+        return actions
+
+
+class BatchLearner(metaclass=abc.ABCMeta):
+
+    @abc.abstractmethod
+    def __call__(self):
+        '''Returns an array with one action per episode.'''
+        raise NotImplemented
+
+    @abc.abstractmethod
+    def update(self, actions, rewards):
+        raise NotImplemented
+
+    @abc.abstractmethod
+    def reset(self):
+        raise NotImplemented
@@ -0,0 +1,145 @@
+
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+
+
+from pybayesbandit.learners import BatchLearner
+from pybayesbandit.rng import default_source
+
+import numpy as np
+
+
+def ucb1(means, counts, started):
+    '''
+    Returns the UCB1 actions of learners given as rows of arm means and
+    pull counts, with `started` pulls per learner (received or pending):
+    each arm once in order, then the arm of highest upper bound.
+    '''
+    n = counts.sum(axis=1)
+    # arms still to be pulled, or whose first rewards are pending, have zero counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bounds = means + np.sqrt(2 * np.log(np.maximum(n, 1))[:, None] / counts)
+    return np.where(started < means.shape[1], started, np.argmax(bounds, axis=1))
+
+
+class BanditFleet(BatchLearner):
+    '''
+    M independent K-armed Beta-Bernoulli learners stored as (M, K) arrays
+    of success and failure counts, with no per-learner objects.
+
+    Thompson sampling (Beta(1, 1) priors) and UCB1 decisions are both
+    derived from the counts, for all learners or for any array of learner
+    ids, in a few NumPy calls. Updates for arbitrary, possibly repeated
+    ids are accumulated with np.add.at. The default float32 counts take
+    8K bytes per learner and are exact up to 2**24 pulls per arm.
+
+    As with `Learner.act`, `act` lets learners decide again before the
+    rewards of earlier decisions arrive: it counts them as pending per
+    learner (4 more bytes each), UCB1 advances its initial round over
+    pending pulls, and each observation later resolves one of them. It is
+    also the lockstep batch of ThompsonSamplingPolicy and UCBPolicy.
+    '''
+
+    POLICIES = ['thompson', 'ucb']
+
+    def __init__(self, M, K, policy='thompson', rng=None, dtype=np.float32):
+        if policy not in self.POLICIES:
+            raise ValueError('unknown fleet policy {!r} (expected one of: {})'.format(policy, ', '.join(self.POLICIES)))
+        self.M = M
+        self.actions = K
+        self.policy = policy
+        self.rng = rng if rng is not None else default_source()
+        self.successes = np.zeros([M, K], dtype=dtype)
+        self.failures = np.zeros([M, K], dtype=dtype)
+        self.pending = np.zeros(M, dtype=np.int32)
+
+    def __len__(self):
+        return self.M
+
+    def __call__(self, ids=None):
+        '''Returns the next action of the learners in `ids` (all if None).'''
+        if self.policy == 'thompson':
+            return self.thompson(ids)
+        return self.ucb(ids)
+
+    def act(self, ids=None):
+        '''
+        Returns the next action of the learners in `ids` (all if None),
+        once per listed id and from the state before the call, and counts
+        them as pending until their rewards arrive.
+        '''
+        actions = self(ids)
+        if ids is None:
+            self.pending += 1
+        else:
+            np.add.at(self.pending, ids, 1)
+        return actions
+
+    def _rows(self, ids):
+        if ids is None:
+            return self.successes, self.failures
+        return self.successes[ids], self.failures[ids]
+
+    def thompson(self, ids=None):
+        successes, failures = self._rows(ids)
+        samples = self.rng.beta(successes + 1.0, failures + 1.0)
+        return np.argmax(samples, axis=1)
+
+    def ucb(self, ids=None):
+        successes, failures = self._rows(ids)
+        counts = successes + failures
+        means = np.divide(successes, counts, out=np.zeros_like(counts), where=counts > 0)
+        started = counts.sum(axis=1).astype(np.int64) + (self.pending if ids is None else self.pending[ids])
+        return ucb1(means, counts, started)
+
+    def update(self, actions, rewards, ids=None):
+        '''
+        Adds one pull of `actions` with `rewards` in [0, 1] to the learners
+        in `ids` (all if None). Repeated ids receive every one of their
+        updates, as in `update_batch`.
+        '''
+        if ids is not None:
+            self.update_batch(ids, actions, rewards)
+            return
+        rewards = np.asarray(rewards, dtype=self.successes.dtype)
+        ids = np.arange(self.M)
+        self.successes[ids, actions] += rewards
+        self.failures[ids, actions] += 1 - rewards
+        np.maximum(self.pending - 1, 0, out=self.pending)
+
+    def update_batch(self, ids, actions, rewards):
+        '''
+        Applies any number of observations (ids[i], actions[i], rewards[i])
+        at once, in no particular order, each resolving one pending action
+        of its learner if there is one.
+        '''
+        ids = np.asarray(ids, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=self.successes.dtype)
+        # np.add.at is several times faster on flat indices into 1-D views
+        cells = ids * self.actions + actions
+        np.add.at(self.successes.reshape(-1), cells, rewards)
+        np.add.at(self.failures.reshape(-1), cells, 1 - rewards)
+        np.subtract.at(self.pending, ids, 1)
+        np.maximum(self.pending, 0, out=self.pending)
+
+    def reset(self, ids=None):
+        '''Resets the learners in `ids` (all if None) to their priors.'''
+        if ids is None:
+            self.successes[...] = 0
+            self.failures[...] = 0
+            self.pending[...] = 0
+        else:
+            self.successes[ids] = 0
+            self.failures[ids] = 0
+            self.pending[ids] = 0
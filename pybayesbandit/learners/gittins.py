@@ -0,0 +1,197 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners import Learner, BatchLearner
+from pybayesbandit.store import ArrayStore
+
+import numpy as np
+
+
+class GittinsIndex():
+    '''
+    Gittins indices of a Beta/Bernoulli arm with discount factor `discount`
+    for all priors (alpha, beta) with alpha + beta <= size.
+
+    Indices are calibrated against a standard arm paying lambda per step,
+    for lambdas on a uniform grid over [0, 1]. For all lambdas at once, the
+    optimal stopping problem "pull the arm or retire on the standard arm"
+    is solved by backward induction over the layers alpha + beta = n,
+    truncated `depth` pulls beyond `size` (where the posterior mean is
+    taken as final). The index of a prior is the lambda at which retiring
+    starts to beat pulling, interpolated linearly between grid points. With
+    discount 0 the index is the posterior mean.
+
+    Solving takes O(grid * (size + depth)^2) time and O(grid * (size +
+    depth)) memory, where depth is about 4.6 / (1 - discount), so tables
+    for long horizons are best solved once into an IndexStore.
+
+    Tables of an IndexStore pickle as a reference to the store, so worker
+    processes map the stored table instead of receiving a copy.
+    '''
+
+    def __init__(self, discount, size, table=None, grid=500, depth=None, store=None):
+        assert 0.0 <= discount < 1.0, 'discount must be in [0, 1)'
+        self.discount = discount
+        self.size = size
+        self.store = store
+        self.grid = grid
+        if depth is None:
+            depth = int(np.ceil(np.log(1e-2) / np.log(discount))) if discount > 0 else 0
+        self.depth = depth
+        self.table = table if table is not None else self.solve()
+
+    def __getitem__(self, key):
+        alphas, betas = key
+        return self.table[alphas, betas]
+
+    def __reduce_ex__(self, protocol):
+        if self.store is None:
+            return super().__reduce_ex__(protocol)
+        return _load_index, (self.store.path, self.discount, self.size)
+
+    def solve(self):
+        g = self.discount
+        if g == 0:
+            alphas, betas = np.meshgrid(np.arange(self.size + 1), np.arange(self.size + 1), indexing='ij')
+            with np.errstate(invalid='ignore'):
+                valid = (alphas >= 1) & (betas >= 1) & (alphas + betas <= self.size)
+                return np.where(valid, alphas / (alphas + betas), np.nan)
+
+        lambdas = np.linspace(0.0, 1.0, self.grid)[:, np.newaxis]
+        retire = lambdas / (1 - g)
+
+        table = np.full([self.size + 1, self.size + 1], np.nan)
+
+        N = self.size + self.depth
+        means = np.arange(1, N) / N
+        V = np.maximum(means, lambdas) / (1 - g)
+
+        for n in range(N - 1, 1, -1):
+            alphas = np.arange(1, n)
+            means = alphas / n
+            pull = means + g * (means * V[:, 1:] + (1 - means) * V[:, :-1])
+            V = np.maximum(pull, retire)
+
+            if n <= self.size:
+                diff = pull - retire
+                k = np.clip((diff > 0).sum(axis=0), 1, self.grid - 1)
+                cols = np.arange(n - 1)
+                lo, hi = diff[k - 1, cols], diff[k, cols]
+                step = lambdas[1, 0] - lambdas[0, 0]
+                table[alphas, n - alphas] = lambdas[k - 1, 0] + step * lo / (lo - hi)
+
+        return table
+
+
+class IndexStore():
+    '''
+    Directory of Gittins index tables, one array per (discount, size) in an
+    ArrayStore (see PolicyStore).
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.arrays = ArrayStore(path)
+
+    def _name(self, discount, size):
+        return 'gittins-g{!r}-N{}'.format(discount, size)
+
+    def load(self, discount, size):
+        table = self.arrays.load(self._name(discount, size), (size + 1, size + 1))
+        if table is None:
+            return None
+        return GittinsIndex(discount, size, table=table, store=self)
+
+    def save(self, index):
+        self.arrays.save(self._name(index.discount, index.size), index.table)
+        index.store = self
+
+
+def _load_index(path, discount, size):
+    return gittins_index(discount, size, path)
+
+
+_indices = {}
+
+
+def gittins_index(discount, size, store=None):
+    '''
+    Returns the GittinsIndex for (discount, size), solving it at most once
+    per process and, given a store directory, once per store.
+    '''
+    key = (discount, size)
+    if key not in _indices:
+        store = IndexStore(store) if store is not None else None
+        index = store.load(discount, size) if store is not None else None
+        if index is None:
+            index = GittinsIndex(discount, size)
+            if store is not None:
+                store.save(index)
+        _indices[key] = index
+    return _indices[key]
+
+
+class GittinsIndexPolicy(Learner):
+
+    def __init__(self, actions, T, params=None):
+        self.actions = actions
+        self.T = T
+        self.discount = getattr(params, 'discount', None)
+        if self.discount is None:
+            self.discount = 1 - 1 / T
+        self.store = getattr(params, 'store', None)
+        self.index = gittins_index(self.discount, T + 2, self.store)
+        self.reset()
+
+    def __call__(self):
+        return int(np.argmax(self.index[self.alphas, self.betas]))
+
+    def update(self, action, reward):
+        self.alphas[action] += reward
+        self.betas[action] += 1 - reward
+
+    def update_batch(self, actions, rewards):
+        rewards = np.asarray(rewards, dtype=np.int64)
+        np.add.at(self.alphas, actions, rewards)
+        np.add.at(self.betas, actions, 1 - rewards)
+
+    def reset(self):
+        self.alphas = np.ones(self.actions, dtype=np.int64)
+        self.betas = np.ones(self.actions, dtype=np.int64)
+
+    def batch(self, N):
+        return BatchGittinsIndexPolicy(self.actions, N, self.index)
+
+
+class BatchGittinsIndexPolicy(BatchLearner):
+
+    def __init__(self, actions, N, index):
+        self.actions = actions
+        self.N = N
+        self.index = index
+        self._episodes = np.arange(N)
+        self.reset()
+
+    def __call__(self):
+        return np.argmax(self.index[self.alphas, self.betas], axis=1)
+
+    def update(self, actions, rewards):
+        self.alphas[self._episodes, actions] += rewards
+        self.betas[self._episodes, actions] += 1 - rewards
+
+    def reset(self):
+        self.alphas = np.ones([self.N, self.actions], dtype=np.int64)
+        self.betas = np.ones([self.N, self.actions], dtype=np.int64)
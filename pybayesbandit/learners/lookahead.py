@@ -14,49 +14,101 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 
+from pybayesbandit import profiling
 from pybayesbandit.learners import Learner
-from pybayesbandit.mdp.beta_bernoulli import BetaBernoulliMDP
+from pybayesbandit.mdp.beta_bernoulli import make_mdp
 from pybayesbandit.search.aotree import AOTreeSearch
+from pybayesbandit.search.cache import heuristic_cache
 
 import sys
+import time
 
 
 class OptimisticLimitedDepthAOTree(AOTreeSearch):
 
-    def __init__(self, mdp):
-        super().__init__(mdp)
+    def __init__(self, mdp, symmetric=False, reuse=False, cache=None):
+        super().__init__(mdp, symmetric=symmetric, reuse=reuse)
+        # leaf values keyed on (steps to go, state), kept across searches
+        self.h = cache
 
     def heuristic(self, state):
+        steps = self.horizon - self.max_depth
+        if self.h is not None:
+            h = self.h.get((steps, state))
+            if h is not None:
+                if profiling.PROFILE is not None:
+                    profiling.PROFILE.count('aotree.h.hits')
+                return h
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('aotree.h.misses')
         best_action, best_mean = None, -sys.maxsize
-        for i, (alpha, beta) in enumerate(state):
+        for i, (alpha, beta) in enumerate(self.mdp.arms(state)):
             mean = alpha / (alpha + beta)
             if mean > best_mean:
                 best_action = i
                 best_mean = mean
-        return (best_action, (self.horizon - self.max_depth) * best_mean)
+        h = (best_action, steps * best_mean)
+        if self.h is not None:
+            self.h.put((steps, state), h)
+        return h
 
 
 class LookaheadTreeSearchPolicy(Learner):
+    '''
+    Optimistic depth-limited AO* lookahead over the Beta-Bernoulli belief
+    MDP.
+
+    With params.deadline (milliseconds per decision) the search deepens
+    iteratively up to params.maxdepth until the deadline. The depth of the
+    last decision is kept in `last_depth`.
+
+    Leaf values are cached across decisions and episodes, holding at most
+    params.cache_size entries. The cache is on by default (2**16 entries)
+    only for packed beliefs: hashing a tuple belief costs about as much as
+    computing its value.
+    '''
 
     def __init__(self, actions, T, params=None):
         self.actions = actions
         self.T = T
         self.max_depth = params.maxdepth
-        self.mdp = BetaBernoulliMDP(self.actions)
-        self.aotree = OptimisticLimitedDepthAOTree(self.mdp)
+        self.deadline = getattr(params, 'deadline', None)
+        self.mdp = make_mdp(self.actions, self.T, packed=getattr(params, 'packed', False))
+        self.aotree = OptimisticLimitedDepthAOTree(self.mdp,
+            symmetric=getattr(params, 'symmetric', False),
+            reuse=getattr(params, 'reuse', False),
+            cache=heuristic_cache('aotree', self.mdp, self.T, params,
+                default=2**16 if getattr(params, 'packed', False) else 0))
         self.reset()
 
     def __call__(self):
+        start = time.perf_counter()
+        deadline = None if self.deadline is None else start + self.deadline / 1000
         depth = min(self.horizon, self.max_depth)
-        action = self.aotree(self.belief, depth, self.horizon)
+        action = self.aotree(self.belief, depth, self.horizon, deadline)
+        self.last_depth = self.aotree.depth_reached
         return action
 
-    def update(self, action, reward):
-        alpha, beta = self.belief[action]
-        self.belief = tuple((params[0] + reward, params[1] + 1 - reward) if i == action else params \
-                for i, params in enumerate(self.belief))
+    def act(self):
+        self._check_horizon(self.horizon)
+        action = self()
         self.horizon -= 1
+        self._pending += 1
+        return action
+
+    def update(self, action, reward):
+        self._check_observations(self.horizon, 1)
+        self.belief = self.mdp.update(self.belief, action, reward)
+        self.horizon -= self._resolve(1)
+
+    def update_batch(self, actions, rewards):
+        self._check_observations(self.horizon, len(actions))
+        self.belief = self.mdp.update_batch(self.belief, actions, rewards)
+        self.horizon -= self._resolve(len(actions))
 
     def reset(self):
         self.horizon = self.T
         self.belief = self.mdp.start
+        self._pending = 0
+        self.last_depth = None
+        self.aotree.reset()
@@ -14,21 +14,44 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 
-from pybayesbandit.learners import Learner
-
-import numpy as np
+from pybayesbandit.learners import Learner, BatchLearner
+from pybayesbandit.rng import default_source
 
 
 class RandomPolicy(Learner):
 
-    def __init__(self, actions, T, params=None):
+    def __init__(self, actions, T, params=None, rng=None):
         self.actions = actions
+        self.rng = rng if rng is not None else default_source()
 
     def __call__(self):
-        return np.random.randint(low=0, high=self.actions)
+        return self.rng.integer(self.actions)
 
     def update(self, action, reward):
         pass
 
+    def update_batch(self, actions, rewards):
+        pass
+
+    def reset(self):
+        pass
+
+    def batch(self, N):
+        return BatchRandomPolicy(self.actions, N, self.rng)
+
+
+class BatchRandomPolicy(BatchLearner):
+
+    def __init__(self, actions, N, rng=None):
+        self.actions = actions
+        self.N = N
+        self.rng = rng if rng is not None else default_source()
+
+    def __call__(self):
+        return self.rng.integers(self.actions, self.N)
+
+    def update(self, actions, rewards):
+        pass
+
     def reset(self):
         pass
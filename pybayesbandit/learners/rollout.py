@@ -15,62 +15,76 @@
 
 
 from pybayesbandit.learners import Learner
-from pybayesbandit.mdp.beta_bernoulli import BetaBernoulliMDP
+from pybayesbandit.mdp.beta_bernoulli import make_mdp
 
 import numpy as np
-import sys
 
 
 class RolloutPolicy(Learner):
 
-    def __init__(self, actions, T, params=None):
+    def __init__(self, actions, T, params=None, rng=None):
         self.actions = actions
         self.T = T
         self.trials = params.trials
-        self.mdp = BetaBernoulliMDP(self.actions)
+        self.mdp = make_mdp(self.actions, self.T, packed=getattr(params, 'packed', False), rng=rng)
+        self.rng = self.mdp.rng
         self.reset()
 
     def __call__(self):
-        best_action = None
-        best_q_value = -sys.maxsize
+        return int(np.argmax(self._q_values(self._belief, self._T)))
 
-        for action in range(self.actions):
-            q = self._q_value(self._belief, action, self._T)
-
-            if q > best_q_value:
-                best_q_value = q
-                best_action = action
-
-        return best_action
+    def act(self):
+        self._check_horizon(self._T)
+        action = self()
+        self._T -= 1
+        self._pending += 1
+        return action
 
     def update(self, action, reward):
-        alpha, beta = self._belief[action]
-        self._belief = tuple((params[0] + reward, params[1] + 1 - reward) if i == action else params \
-                for i, params in enumerate(self._belief))
-        self._T -= 1
+        self._check_observations(self._T, 1)
+        self._belief = self.mdp.update(self._belief, action, reward)
+        self._T -= self._resolve(1)
+
+    def update_batch(self, actions, rewards):
+        self._check_observations(self._T, len(actions))
+        self._belief = self.mdp.update_batch(self._belief, actions, rewards)
+        self._T -= self._resolve(len(actions))
 
     def reset(self):
         self._T = self.T
         self._belief = self.mdp.start
-
-    def _rollout(self, state, action, depth):
-        total = 0.0
-
-        next_state = self.mdp.sample(state, action)
-        total += self.mdp.reward(state, action, next_state)
-
-        for step in range(depth-1):
-            state = next_state
-            action = np.random.randint(0, self.mdp.actions)
-            next_state = self.mdp.sample(state, action)
-            total += self.mdp.reward(state, action, next_state)
-
-        return total
-
-    def _q_value(self, state, action, depth):
-        q = 0.0
-        for _ in range(self.trials):
-            q += self._rollout(state, action, depth)
-        q /= self.trials
-        return q
-
+        self._pending = 0
+
+    def _q_values(self, state, depth):
+        '''
+        Estimates the Q-values of all actions at `state` by running `trials`
+        random rollouts of `depth` steps per action, all in lock-step.
+
+        Rollout i of root action a owns the K posterior cells starting at
+        (a * trials + i) * K of the flat alpha and beta arrays. Actions and
+        reward uniforms for every step are drawn upfront; rewards and
+        transitions follow `self.mdp`.
+        '''
+        K, trials = self.actions, self.trials
+        rollouts = K * trials
+
+        params = np.array(self.mdp.arms(state), dtype=np.float64)
+        alphas = np.tile(params[:, 0], rollouts)
+        betas = np.tile(params[:, 1], rollouts)
+
+        actions = self.rng.integers(K, (depth, rollouts))
+        uniforms = self.rng.uniforms((depth, rollouts))
+        actions[0] = np.repeat(np.arange(K), trials)
+        cells = actions + np.arange(rollouts) * K
+
+        totals = np.zeros(rollouts)
+        for step in range(depth):
+            arms = cells[step]
+            alpha, beta = alphas[arms], betas[arms]
+            theta = alpha / (alpha + beta)
+            totals += theta
+            r = uniforms[step] >= theta
+            alphas[arms] = alpha + r
+            betas[arms] = beta + ~r
+
+        return totals.reshape(K, trials).mean(axis=1)
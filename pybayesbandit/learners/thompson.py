@@ -16,18 +16,21 @@
 
 
 from pybayesbandit.learners import Learner
+from pybayesbandit.learners.fleet import BanditFleet
+from pybayesbandit.rng import default_source
 
 import numpy as np
 
 
 class ThompsonSamplingPolicy(Learner):
 
-    def __init__(self, actions, T, params=None):
+    def __init__(self, actions, T, params=None, rng=None):
         self.actions = actions
+        self.rng = rng if rng is not None else default_source()
         self.reset()
 
     def __call__(self):
-        samples = [np.random.beta(alpha, beta) for alpha, beta in self.betas]
+        samples = [self.rng.beta(alpha, beta) for alpha, beta in self.betas]
         return np.argmax(samples)
 
     def update(self, action, reward):
@@ -38,5 +41,24 @@ class ThompsonSamplingPolicy(Learner):
             beta += 1
         self.betas[action] = (alpha, beta)
 
+    def update_batch(self, actions, rewards):
+        actions = np.asarray(actions, dtype=np.int64)
+        pulls = np.bincount(actions, minlength=self.actions)
+        successes = np.bincount(actions, weights=np.asarray(rewards) == 1, minlength=self.actions)
+        self.betas = [
+            (alpha + s, beta + n - s)
+            for (alpha, beta), s, n in zip(self.betas, successes.tolist(), pulls.tolist())
+        ]
+
     def reset(self):
         self.betas = [(1.0, 1.0)] * self.actions
+
+    def batch(self, N):
+        return BanditFleet(N, self.actions, 'thompson', self.rng, dtype=np.float64)
+
+    @classmethod
+    def act_many(cls, learners):
+        # one Beta draw per arm of every learner, from the first one's source
+        betas = np.array([learner.betas for learner in learners])
+        samples = learners[0].rng.beta(betas[..., 0], betas[..., 1])
+        return np.argmax(samples, axis=1)
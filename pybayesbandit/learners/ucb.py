@@ -15,6 +15,7 @@
 
 
 from pybayesbandit.learners import Learner
+from pybayesbandit.learners.fleet import BanditFleet, ucb1
 
 import numpy as np
 
@@ -26,17 +27,47 @@ class UCBPolicy(Learner):
         self.reset()
 
     def __call__(self):
-        if self.n < self.actions:
-            return self.n
-        else:
-            return np.argmax(self.avg + np.sqrt(2 * np.log(self.n) / self.counts))
+        # the initial round also counts pulls whose rewards are pending
+        started = self.n + self._pending
+        if started < self.actions:
+            return started
+        return ucb1(self.avg[np.newaxis], self.counts[np.newaxis], np.array([started]))[0]
+
+    def act(self):
+        action = self()
+        self._pending += 1
+        return action
 
     def update(self, action, reward):
+        self._resolve(1)
         self.n += 1
         self.counts[action] += 1
         self.avg[action] = self.avg[action] + (1 / self.counts[action]) * (reward - self.avg[action])
 
+    def update_batch(self, actions, rewards):
+        self._resolve(len(actions))
+        actions = np.asarray(actions, dtype=np.int64)
+        pulls = np.bincount(actions, minlength=self.actions)
+        sums = np.bincount(actions, weights=rewards, minlength=self.actions)
+        counts = self.counts + pulls
+        self.avg = np.divide(self.avg * self.counts + sums, counts, out=self.avg.copy(), where=pulls > 0)
+        self.counts = counts
+        self.n += len(actions)
+
     def reset(self):
         self.avg = np.zeros(self.actions)
         self.counts = np.zeros(self.actions)
         self.n = 0
+        self._pending = 0
+
+    def batch(self, N):
+        return BanditFleet(N, self.actions, 'ucb', dtype=np.float64)
+
+    @classmethod
+    def act_many(cls, learners):
+        started = np.array([learner.n + learner._pending for learner in learners])
+        avg = np.array([learner.avg for learner in learners])
+        counts = np.array([learner.counts for learner in learners])
+        for learner in learners:
+            learner._pending += 1
+        return ucb1(avg, counts, started)
@@ -14,76 +14,262 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 
+from pybayesbandit import profiling
 from pybayesbandit.learners import Learner
-from pybayesbandit.mdp.beta_bernoulli import BetaBernoulliMDP
+from pybayesbandit.mdp.beta_bernoulli import make_mdp
+from pybayesbandit.rng import RandomSource, default_source
+from pybayesbandit.search.cache import cache_name, heuristic_cache, shared_cache
 from pybayesbandit.search.mcts import MCTS
 
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import copy
+import math
+import multiprocessing
 import numpy as np
-import sys
+import os
+import time
+
+
+# up to this many actions, UCT.tree_policy scores actions one at a time
+SCALAR_ACTIONS = 12
 
 
 class UCT(MCTS):
 
-    def __init__(self, mdp):
-        super().__init__(mdp)
-        self.h = {}
+    def __init__(self, mdp, symmetric=False, cache=None, decay=1.0):
+        super().__init__(mdp, symmetric=symmetric, decay=decay)
+        # leaf values keyed on (steps to go, state), which may outlive the tree
+        self.h = cache
 
     def tree_policy(self, node, C=2):
-        best_action = None
-        best_q_value = -sys.maxsize
+        if self.mdp.actions <= SCALAR_ACTIONS:
+            return self._scalar_tree_policy(node, C)
 
-        for a in node.succ:
-            if a.visits == 0:
-                return a
+        visits = self.nodes.chance_visits[node]
+        action = visits.argmin()
+        if visits[action] == 0:
+            return action
 
-            q = a.value + C * np.sqrt(2 * np.log(node.visits) / a.visits)
+        q = self.nodes.chance_values[node] + C * np.sqrt(2 * math.log(self.nodes.visits[node]) / visits)
+        return q.argmax()
 
-            if q > best_q_value:
-                best_q_value = q
-                best_action = a
+    def _scalar_tree_policy(self, node, C):
+        # the same scores as tree_policy, in Python floats, which beat
+        # NumPy calls on rows of a few actions
+        visits = self.nodes.chance_visits[node].tolist()
+        if 0.0 in visits:
+            return visits.index(0.0)
 
+        scale = 2 * math.log(self.nodes.visits.item(node))
+        best_action, best_q = 0, None
+        for action, (value, n) in enumerate(zip(self.nodes.chance_values[node].tolist(), visits)):
+            q = value + C * math.sqrt(scale / n)
+            if best_q is None or q > best_q:
+                best_action, best_q = action, q
         return best_action
 
     def default_policy(self, state):
-        return np.random.randint(0, self.mdp.actions)
+        return self.mdp.rng.integer(self.mdp.actions)
 
-    def init_q_value(self, node, d):
-        alpha, beta = node.state[node.action]
+    def init_q_value(self, state, action, d):
+        alpha, beta = self.mdp.arm(state, action)
         h = (self.horizon - d) * alpha / (alpha + beta)
         return h
 
+    def init_q_values(self, states, actions, depths):
+        params = np.array([self.mdp.arm(state, action) for state, action in zip(states, actions)])
+        return (self.horizon - np.asarray(depths)) * params[:, 0] / params.sum(axis=1)
+
     def heuristic(self, state):
-        if state in self.h:
-            return self.h[state]
-        best_mean = max(alpha / (alpha + beta) for (alpha, beta) in state)
-        h = (self.horizon - self.max_depth) * best_mean
-        self.h[state] = h
+        steps = self.horizon - self.max_depth
+        if self.h is not None:
+            h = self.h.get((steps, state))
+            if h is not None:
+                if profiling.PROFILE is not None:
+                    profiling.PROFILE.count('uct.h.hits')
+                return h
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('uct.h.misses')
+        best_mean = max(alpha / (alpha + beta) for (alpha, beta) in self.mdp.arms(state))
+        h = steps * best_mean
+        if self.h is not None:
+            self.h.put((steps, state), h)
         return h
 
 
+# (workers, pool) of root-parallel searches, shared by all policies in the
+# process and replaced when a policy asks for another number of workers
+_pool = None
+
+
+def _executor(workers):
+    global _pool
+    if _pool is None or _pool[0] != workers:
+        shutdown_executor()
+        _pool = (workers, ProcessPoolExecutor(max_workers=workers))
+    return _pool[1]
+
+
+@atexit.register
+def shutdown_executor():
+    '''Shuts down the root-parallel search pool, if any (also done at exit).'''
+    global _pool
+    if _pool is not None:
+        _pool[1].shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _root_search(mdp, symmetric, seed, start, max_depth, horizon, trials, C, budget=None, cache_size=None):
+    # the budget is passed in seconds, as perf_counter values are not
+    # comparable across processes
+    deadline = None if budget is None else time.perf_counter() + budget
+    mdp = copy.copy(mdp)
+    mdp.rng = RandomSource(seed)
+    # worker trees are built per decision, so their leaf values are kept in
+    # a cache shared by the process instead
+    if cache_size == 0:
+        cache = None
+    else:
+        cache = shared_cache(cache_name('uct', mdp, horizon), 2**16 if cache_size is None else cache_size)
+    uct = UCT(mdp, symmetric=symmetric, cache=cache)
+    visits, values = uct.search(start, max_depth, horizon, trials, C, deadline=deadline)
+    return visits, values, uct.trials_run
+
+
 class BetaBernoulliUCTPolicy(Learner):
+    '''
+    UCT over the Beta-Bernoulli belief MDP.
+
+    With params.deadline (milliseconds per decision) trials stop at the
+    deadline, and params.trials only caps them (None for no cap). The depth
+    and number of trials of the last decision are kept in `last_depth` and
+    `last_trials`.
 
-    def __init__(self, actions, T, params):
+    With params.reuse the tree is kept across decisions, and its visit
+    counts are scaled by params.reuse_decay (default 0.5) whenever the root
+    advances (see `MCTS.prune`).
+
+    Given params.seed, searches are reproducible: single-tree searches draw
+    from a stream seeded at every reset from params.seed and an episode key,
+    and root-parallel trees from seeds derived from both and the step (see
+    `_seeds`). The episode key is drawn from `rng` (by default the process
+    source, which `Game.episodes` reseeds per episode).
+
+    Leaf values are cached across decisions and episodes in `h`, holding at
+    most params.cache_size entries (default 2**16, see
+    `search.cache.heuristic_cache`).
+    '''
+
+    def __init__(self, actions, T, params, rng=None):
         self.actions = actions
         self.T = T
         self.trials = params.trials
         self.max_depth = params.maxdepth
         self.C = params.C
-        self.mdp = BetaBernoulliMDP(self.actions)
+        self.deadline = getattr(params, 'deadline', None)
+        assert self.trials is not None or self.deadline is not None, 'trials or deadline required'
+        self.symmetric = getattr(params, 'symmetric', False)
+        self.reuse = getattr(params, 'reuse', False)
+        self.decay = getattr(params, 'reuse_decay', None)
+        if self.decay is None:
+            self.decay = 0.5
+        self.parallel = getattr(params, 'parallel', None)
+        self.workers = getattr(params, 'search_workers', None) or os.cpu_count()
+        self.leaf_batch = getattr(params, 'leaf_batch', 8)
+        self.seed = getattr(params, 'seed', None)
+        self.rng = rng if rng is not None else default_source()
+        # given a seed, searches draw from their own stream, seeded per episode
+        search_rng = RandomSource() if self.seed is not None else self.rng
+        self.mdp = make_mdp(self.actions, self.T, packed=getattr(params, 'packed', False), rng=search_rng)
+        self.h = heuristic_cache('uct', self.mdp, self.T, params)
+        self.cache_size = getattr(params, 'cache_size', None)
         self.reset()
 
     def __call__(self):
+        start = time.perf_counter()
+        deadline = None if self.deadline is None else start + self.deadline / 1000
         depth = min(self._step, self.max_depth)
-        self.uct = UCT(self.mdp)
-        action = self.uct(self._belief, depth, self.T, self.trials, self.C)
+        self.last_depth = depth
+        if self.parallel == 'root':
+            return self._root_parallel(depth, deadline)
+
+        if not self.reuse or self.uct is None:
+            self.uct = UCT(self.mdp, symmetric=self.symmetric, cache=self.h, decay=self.decay)
+        batch = self.leaf_batch if self.parallel == 'leaf' else 1
+        action = self.uct(self._belief, depth, self.T, self.trials, self.C, batch, deadline)
+        self.last_trials = self.uct.trials_run
         return action
 
-    def update(self, action, reward):
-        alpha, beta = self._belief[action]
-        self._belief = tuple((params[0] + reward, params[1] + 1 - reward) if i == action else params \
-                for i, params in enumerate(self._belief))
+    def _root_parallel(self, depth, deadline=None):
+        '''
+        Searches independent trees in worker processes, splitting the trial
+        budget, and picks the action with the best visit-weighted value.
+        Under a deadline every tree runs until the deadline instead.
+        '''
+        if self.trials is None:
+            workers = self.workers
+            trials = [None] * workers
+        else:
+            workers = min(self.workers, self.trials)
+            trials = [self.trials // workers + (i < self.trials % workers) for i in range(workers)]
+        budget = None if deadline is None else deadline - time.perf_counter()
+        searches = [
+            (self.mdp, self.symmetric, seed, self._belief, depth, self.T, n, self.C, budget, self.cache_size)
+            for seed, n in zip(self._seeds(workers), trials)
+        ]
+        if multiprocessing.parent_process() is None:
+            executor = _executor(self.workers)
+            results = [future.result() for future in [executor.submit(_root_search, *args) for args in searches]]
+        else:
+            # already in a worker process (e.g. Game.run with workers > 1),
+            # where nested process pools would deadlock on exit
+            results = [_root_search(*args) for args in searches]
+
+        visits = np.zeros(self.actions)
+        totals = np.zeros(self.actions)
+        for n, values, _ in results:
+            visits += n
+            totals += n * values
+        self.last_trials = sum(trials_run for _, _, trials_run in results)
+        values = np.divide(totals, visits, out=np.zeros(self.actions), where=visits > 0)
+        return int(np.argmax(values))
+
+    def _seeds(self, n):
+        '''
+        Draws one seed per worker tree. Seeds depend only on params.seed, on
+        the episode key drawn at reset and on the step, so they are the same
+        whichever process plays the episode.
+        '''
+        entropy = self.seed if self.seed is not None else self.rng.integer(2**31)
+        sequence = np.random.SeedSequence(entropy, spawn_key=(self._episode, self.T - self._step))
+        return [int(child.generate_state(1)[0]) for child in sequence.spawn(n)]
+
+    def act(self):
+        self._check_horizon(self._step)
+        action = self()
         self._step -= 1
+        self._pending += 1
+        return action
+
+    def update(self, action, reward):
+        self._check_observations(self._step, 1)
+        self._belief = self.mdp.update(self._belief, action, reward)
+        self._step -= self._resolve(1)
+
+    def update_batch(self, actions, rewards):
+        self._check_observations(self._step, len(actions))
+        self._belief = self.mdp.update_batch(self._belief, actions, rewards)
+        self._step -= self._resolve(len(actions))
 
     def reset(self):
         self._step = self.T
         self._belief = self.mdp.start
+        self._pending = 0
+        self.last_depth = None
+        self.last_trials = None
+        if self.parallel == 'root' or self.seed is not None:
+            self._episode = self.rng.integer(2**31)
+        if self.seed is not None and self.parallel != 'root':
+            self.mdp.rng.seed(np.random.SeedSequence(self.seed, spawn_key=(self._episode,)))
+        self.uct = None
@@ -13,18 +13,31 @@
 # You should have received a copy of the GNU General Public License
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
+from pybayesbandit import profiling
 from pybayesbandit.learners import Learner
-from pybayesbandit.mdp.beta_bernoulli import BetaBernoulliMDP
+from pybayesbandit.mdp.beta_bernoulli import make_mdp
+from pybayesbandit.search.cache import LayerCache, SpillCache
+from pybayesbandit.store import ArrayStore
 
+import math
+import numpy as np
 import sys
 
 
 class ValueIteration():
+    '''
+    Recursive value iteration from the prior, memoizing (action, value)
+    per (T, belief) in `cache`: a dict by default, or a bounded LayerCache
+    (evicted values are recomputed when needed again, cheaply down to
+    about a quarter of the states) or SpillCache (evicted values are read
+    back from disk) to solve within a memory cap.
+    '''
 
-    def __init__(self, mdp):
+    def __init__(self, mdp, symmetric=False, cache=None):
         self._mdp = mdp
-        self._V = {}
-        
+        self._symmetric = symmetric
+        self._V = cache if cache is not None else {}
+
     def __call__(self, T):
         self.V(self._mdp.start, T)
         return self._V
@@ -33,17 +46,29 @@ class ValueIteration():
         if T == 0:
             return (None, 0.0)
 
-        if (T, belief) in self._V:
-            return self._V[(T, belief)]
+        if self._symmetric:
+            belief, order = self._mdp.canonical(belief)
+
+        entry = self._V.get((T, belief))
+        if entry is not None:
+            action, value = entry
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('vi.V.hits')
+        else:
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('vi.V.misses')
+            action, value = None, -sys.maxsize
+            for a in range(self._mdp.actions):
+                Q = self.Q(a, belief, T)
+                if Q > value:
+                    action = a
+                    value = Q
 
-        action, value = None, -sys.maxsize
-        for a in range(self._mdp.actions):
-            Q = self.Q(a, belief, T)
-            if Q > value:
-                action = a
-                value = Q
+            self._V[(T, belief)] = (action, value)
+
+        if self._symmetric:
+            action = order[action]
 
-        self._V[(T, belief)] = (action, value)
         return (action, value)
 
     def Q(self, action, belief, T):
@@ -53,29 +78,286 @@ class ValueIteration():
         return q_value
 
 
+# cells of a layer processed at once by BackwardInduction
+CHUNK_CELLS = 2**20
+
+
+def _comb(n, k):
+    '''Binomial coefficients C(n, k) of an int64 array n.'''
+    result = np.ones_like(n)
+    for t in range(k):
+        result = result * (n - t) // (t + 1)
+    return result
+
+
+def _partial_sums(n, dims):
+    '''
+    Returns `dims` int32 columns P_1 <= ... <= P_dims <= n listing every
+    such sequence, ranked as in BeliefLayers. The sequences bounded by
+    m < n are a prefix of those bounded by n.
+    '''
+    columns = []
+    for i in range(1, dims + 1):
+        # column i repeats y once per sequence of i-1 values bounded by y
+        lengths = np.array([math.comb(y + i - 1, i - 1) for y in range(n + 1)])
+        index = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        columns = [column[index] for column in columns]
+        columns.append(np.repeat(np.arange(n + 1, dtype=np.int32), lengths))
+    return columns
+
+
+class BeliefLayers():
+    '''
+    (action, value) table of a Beta/Bernoulli belief MDP solved from the
+    uniform prior over T steps.
+
+    Layer n holds every belief reachable after n pulls, one cell per way of
+    splitting n into the 2K per-arm success and failure counts c_0..c_2K-1.
+    With partial sums P_i = c_0 + ... + c_i-1, a belief's cell is
+    sum_i C(P_i + i - 1, i) for i < 2K, which numbers the layer's
+    C(n + 2K - 1, 2K - 1) beliefs without gaps. All layers are stored back
+    to back in flat `policy` and `values` arrays.
+
+    Tables of a PolicyStore pickle as a reference to the store, so worker
+    processes map the stored arrays instead of receiving copies.
+    '''
+
+    def __init__(self, mdp, T, policy=None, values=None, store=None):
+        self.mdp = mdp
+        self.T = T
+        self.store = store
+        self.ndim = 2 * mdp.actions - 1
+        self.sizes = [math.comb(n + self.ndim, self.ndim) for n in range(T + 1)]
+        self.offsets = np.cumsum([0] + self.sizes[:T])
+        size = self.cells(mdp.actions, T)
+        self.policy = policy if policy is not None else np.zeros(size, dtype=np.int8)
+        self.values = values if values is not None else np.zeros(size, dtype=np.float32)
+
+    @staticmethod
+    def cells(K, T):
+        '''Returns the number of beliefs in layers 0..T-1.'''
+        return math.comb(T + 2 * K - 1, 2 * K)
+
+    def layer(self, n):
+        start, stop = self.offsets[n], self.offsets[n + 1]
+        return self.policy[start:stop], self.values[start:stop]
+
+    def cell(self, belief):
+        '''Returns the cell of `belief` within its layer.'''
+        cell, total = 0, 0
+        counts = [count - 1 for params in self.mdp.arms(belief) for count in params]
+        for i, count in enumerate(counts[:-1], 1):
+            total += count
+            cell += math.comb(total + i - 1, i)
+        return cell
+
+    def __getitem__(self, key):
+        T, belief = key
+        index = self.offsets[self.T - T] + self.cell(belief)
+        return (int(self.policy[index]), float(self.values[index]))
+
+    def __reduce_ex__(self, protocol):
+        if self.store is None:
+            return super().__reduce_ex__(protocol)
+        return _load_layers, (self.store.path, self.mdp, self.T)
+
+
+class PolicyStore():
+    '''
+    Directory of solved BeliefLayers tables, one pair of arrays per (K, T)
+    in an ArrayStore, which memory-maps them read-only so every process
+    using the same store shares a single copy of each table. Tables solved
+    for the store are written to memory-mapped temporary files as they are
+    solved, so they need not fit in memory.
+    '''
+
+    DTYPES = {'policy': np.int8, 'values': np.float32}
+
+    def __init__(self, path):
+        self.path = path
+        self.arrays = ArrayStore(path)
+
+    def _name(self, K, T, name):
+        return 'beta_bernoulli-K{}-T{}.{}'.format(K, T, name)
+
+    def load(self, mdp, T):
+        size = BeliefLayers.cells(mdp.actions, T)
+        arrays = {}
+        for name in self.DTYPES:
+            # tables written with another layout fail the shape check
+            arrays[name] = self.arrays.load(self._name(mdp.actions, T, name), (size,))
+            if arrays[name] is None:
+                return None
+        return BeliefLayers(mdp, T, store=self, **arrays)
+
+    def create(self, mdp, T):
+        '''Returns an empty table for (K, T) in temporary files, to solve and then `save`.'''
+        size = BeliefLayers.cells(mdp.actions, T)
+        arrays = {
+            name: self.arrays.create(self._name(mdp.actions, T, name), (size,), dtype)
+            for name, dtype in self.DTYPES.items()
+        }
+        return BeliefLayers(mdp, T, **arrays)
+
+    def save(self, table):
+        # policy goes last: load() only trusts a table once both files exist
+        for name in ['values', 'policy']:
+            self.arrays.save(self._name(table.mdp.actions, table.T, name), getattr(table, name))
+        table.store = self
+
+
+def _load_layers(path, mdp, T):
+    table = PolicyStore(path).load(mdp, T)
+    if table is None:
+        raise FileNotFoundError('no K={} T={} table in policy store {!r}'.format(mdp.actions, T, path))
+    return table
+
+
+class BackwardInduction():
+    '''
+    Bottom-up value iteration over belief layers (see BeliefLayers).
+
+    Layers are solved from n = T-1 down to the prior, computing the Q-values
+    of the beliefs in a layer CHUNK_CELLS at a time with array arithmetic
+    over the layer below. There is no recursion, so the horizon is bounded
+    only by the size of the layers: besides the table, a solve holds about
+    3K + 2 arrays the size of the largest layer.
+    '''
+
+    def __init__(self, mdp, store=None):
+        self._mdp = mdp
+        self._store = store
+        self._V = None
+
+    def __call__(self, T):
+        if self._store is not None:
+            self._V = self._store.load(self._mdp, T)
+            if self._V is None:
+                self._V = self.solve(T, self._store.create(self._mdp, T))
+                self._store.save(self._V)
+        else:
+            self._V = self.solve(T)
+        return self._V
+
+    def solve(self, T, table=None):
+        K = self._mdp.actions
+        table = table if table is not None else BeliefLayers(self._mdp, T)
+        d = 2 * K
+        columns = _partial_sums(T - 1, d - 1)
+
+        # Adding one to count j moves a belief in cell c to cell shifts[j][c]
+        # of the next layer, and all but the last arm's posterior means
+        # depend only on the cell, so both are computed once for all layers.
+        # The last arm's failures are implied by the layer: adding one keeps
+        # the cell, and its mean needs P_2K-2 and its successes.
+        size = table.sizes[T - 1]
+        dtype = np.int32 if table.sizes[T] < 2**31 else np.int64
+        shifts = [np.empty(size, dtype=dtype) for _ in range(d - 1)]
+        means = [np.empty(size) for _ in range(K - 1)]
+        for start in range(0, size, CHUNK_CELLS):
+            stop = min(start + CHUNK_CELLS, size)
+            P = [np.zeros(stop - start, dtype=np.int64)]
+            P += [column[start:stop].astype(np.int64) for column in columns]
+            shift = np.arange(start, stop)
+            for j in reversed(range(d - 1)):
+                shift = shift + _comb(P[j + 1] + j, j)
+                shifts[j][start:stop] = shift
+            for a in range(K - 1):
+                means[a][start:stop] = (P[2 * a + 1] - P[2 * a] + 1) / (P[2 * a + 2] - P[2 * a] + 2)
+        last_successes = columns[-1] - columns[-2] if K > 1 else columns[-1]
+        last_start = columns[-2] if K > 1 else np.zeros(size, dtype=np.int32)
+        del columns
+
+        V_next = np.zeros(table.sizes[T])
+        for n in reversed(range(T)):
+            policy, values = table.layer(n)
+            V = np.empty(table.sizes[n])
+            for start in range(0, table.sizes[n], CHUNK_CELLS):
+                stop = min(start + CHUNK_CELLS, table.sizes[n])
+                Q = np.empty((K, stop - start))
+                for a in range(K - 1):
+                    mean = means[a][start:stop]
+                    success = V_next[shifts[2 * a][start:stop]]
+                    failure = V_next[shifts[2 * a + 1][start:stop]]
+                    Q[a] = mean * (1 + success) + (1 - mean) * failure
+                mean = (last_successes[start:stop] + 1.0) / (n + 2.0 - last_start[start:stop])
+                success = V_next[shifts[d - 2][start:stop]]
+                Q[K - 1] = mean * (1 + success) + (1 - mean) * V_next[start:stop]
+
+                V[start:stop] = Q.max(axis=0)
+                policy[start:stop] = np.argmax(Q, axis=0)
+            values[...] = V
+            V_next = V
+
+        return table
+
+    def V(self, belief, T):
+        return self._V[(T, belief)]
+
+
 class BetaBernoulliVIPolicy(Learner):
 
     def __init__(self, actions, T, params=None):
         self.actions = actions
         self.T = T
+        self.packed = getattr(params, 'packed', False)
+        self.symmetric = getattr(params, 'symmetric', False)
+        self.solver = getattr(params, 'solver', 'recursive')
+        self.store = getattr(params, 'store', None)
+        self.cache_size = getattr(params, 'cache_size', None)
+        self.spill = getattr(params, 'spill', None)
+        if self.store is not None and self.solver != 'backward':
+            raise ValueError('policy store requires the backward solver')
+        if self.symmetric and self.solver == 'backward':
+            raise ValueError('symmetric value iteration requires the recursive solver')
+        if (self.cache_size is not None or self.spill is not None) and self.solver == 'backward':
+            raise ValueError('cache size and spill require the recursive solver')
+        if self.cache_size is not None and self.cache_size < 2:
+            raise ValueError('value iteration cache size must be at least 2')
         self._solve()
         self.reset()
 
     def _solve(self):
-        self._mdp = BetaBernoulliMDP(self.actions)
-        self._vi = ValueIteration(self._mdp)
+        self._mdp = make_mdp(self.actions, self.T, packed=self.packed)
+        if self.solver == 'backward':
+            store = PolicyStore(self.store) if self.store is not None else None
+            self._vi = BackwardInduction(self._mdp, store=store)
+        else:
+            if self.spill is not None:
+                cache = SpillCache(self.cache_size or 2**20, self.spill)
+            elif self.cache_size is not None:
+                cache = LayerCache(self.cache_size)
+            else:
+                cache = None
+            self._vi = ValueIteration(self._mdp, symmetric=self.symmetric, cache=cache)
         self._V = self._vi(self.T)
 
     def __call__(self):
-        action, _ = self._V[(self._T, self._belief)]
+        if self.solver == 'backward' and self._pending:
+            # the table holds each belief at its own horizon only, which
+            # pending actions would shorten
+            raise ValueError('the backward solver needs the reward of each action before the next one')
+        action, _ = self._vi.V(self._belief, self._T)
         return action
 
-    def update(self, action, reward):
-        alpha, beta = self._belief[action]
-        self._belief = tuple((params[0] + reward, params[1] + 1 - reward) if i == action else params \
-                for i, params in enumerate(self._belief))
+    def act(self):
+        self._check_horizon(self._T)
+        action = self()
         self._T -= 1
+        self._pending += 1
+        return action
+
+    def update(self, action, reward):
+        self._check_observations(self._T, 1)
+        self._belief = self._mdp.update(self._belief, action, reward)
+        self._T -= self._resolve(1)
+
+    def update_batch(self, actions, rewards):
+        self._check_observations(self._T, len(actions))
+        self._belief = self._mdp.update_batch(self._belief, actions, rewards)
+        self._T -= self._resolve(len(actions))
 
     def reset(self):
         self._T = self.T
         self._belief = self._mdp.start
+        self._pending = 0
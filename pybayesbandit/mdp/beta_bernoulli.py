@@ -14,31 +14,82 @@
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 
+from pybayesbandit import profiling
 from pybayesbandit.mdp import BeliefMDP
+from pybayesbandit.rng import default_source
 
 import numpy as np
 
 
 class BetaBernoulliMDP(BeliefMDP):
 
-    def __init__(self, actions):
+    def __init__(self, actions, rng=None):
         self.actions = actions
+        self.rng = rng if rng is not None else default_source()
 
     @property
     def start(self):
         '''Uniform prior'''
         return tuple([(1, 1)] * self.actions)
 
+    def arm(self, belief, action):
+        '''Returns the (alpha, beta) posterior parameters of `action`.'''
+        return belief[action]
+
+    def arms(self, belief):
+        '''Returns the (alpha, beta) posterior parameters of all arms.'''
+        return belief
+
+    def update(self, belief, action, reward):
+        '''Returns the posterior after observing `reward` for `action`.'''
+        return tuple((params[0] + reward, params[1] + 1 - reward) if i == action else params \
+            for i, params in enumerate(belief))
+
+    def update_batch(self, belief, actions, rewards):
+        '''Returns the posterior after observing `rewards` for `actions`, in any order.'''
+        return tuple((alpha + successes, beta + failures)
+            for (alpha, beta), (successes, failures) in zip(self.arms(belief), self._outcomes(actions, rewards)))
+
+    def _outcomes(self, actions, rewards):
+        '''Returns the (successes, failures) counts of each arm in a batch of observations.'''
+        actions = np.asarray(actions, dtype=np.int64)
+        pulls = np.bincount(actions, minlength=self.actions)
+        successes = np.bincount(actions, weights=rewards, minlength=self.actions).astype(np.int64)
+        return list(zip(successes.tolist(), (pulls - successes).tolist()))
+
+    def pulls(self, belief):
+        '''Returns the number of observations since the uniform prior.'''
+        return sum(alpha + beta - 2 for alpha, beta in self.arms(belief))
+
+    def descends(self, belief, ancestor):
+        '''Checks whether `belief` is reachable from `ancestor`.'''
+        return all(alpha >= alpha0 and beta >= beta0
+            for (alpha, beta), (alpha0, beta0) in zip(self.arms(belief), self.arms(ancestor)))
+
+    def canonical(self, belief):
+        '''
+        Returns the representative of the arm-permutation class of `belief`
+        and the arm order mapping canonical arm indices back to `belief`'s.
+        '''
+        order = sorted(range(self.actions), key=belief.__getitem__)
+        return tuple(belief[i] for i in order), order
+
+    # number of outcomes of a transition, indexed by reward
+    outcomes = 2
+
     def sample(self, belief, action):
         '''
         Sample from belief-state transition.
         '''
-        alpha, beta = belief[action]
+        return self.update(belief, action, self.outcome(belief, action))
+
+    def outcome(self, belief, action):
+        '''Samples the reward of a transition, as `sample` does, without building the next belief.'''
+        if profiling.PROFILE is not None:
+            profiling.PROFILE.count('mdp.samples')
+        alpha, beta = self.arm(belief, action)
         theta = alpha / (alpha + beta)
-        r = int(np.random.sample() >= theta)
-        next_belief = tuple((params[0] + r, params[1] + 1 - r) if i == action else params \
-            for i, params in enumerate(belief))
-        return next_belief
+        return int(self.rng.uniform() >= theta)
 
     # def sample(self, belief, action):
     #     '''
@@ -53,12 +104,13 @@ class BetaBernoulliMDP(BeliefMDP):
     #     return next_belief
 
     def transition(self, belief, action):
-        alpha, beta = belief[action]
+        if profiling.PROFILE is not None:
+            profiling.PROFILE.count('mdp.transitions')
+        alpha, beta = self.arm(belief, action)
 
         probs_and_next_beliefs = []
         for r in [0, 1]:
-            next_belief = tuple((params[0] + r, params[1] + 1 - r) if i == action else params \
-                for i, params in enumerate(belief))
+            next_belief = self.update(belief, action, r)
             prob = (r * alpha + (1 - r) * beta) / (alpha + beta)
             probs_and_next_beliefs.append((prob, next_belief))
 
@@ -77,7 +129,7 @@ class BetaBernoulliMDP(BeliefMDP):
 
     def reward(self, belief, action, next_belief):
         '''Expected Utility (EU[b_t, a_t])'''
-        alpha, beta = belief[action]
+        alpha, beta = self.arm(belief, action)
         return alpha / (alpha + beta)
 
     # def reward(self, belief, action, next_belief):
@@ -88,3 +140,61 @@ class BetaBernoulliMDP(BeliefMDP):
     #         return 1
     #     if next_alpha - alpha == 0 and next_beta - beta == 1:
     #         return 0
+
+
+class PackedBetaBernoulliMDP(BetaBernoulliMDP):
+    '''
+    Beta/Bernoulli belief MDP with beliefs packed into a single integer.
+
+    Each arm keeps its success and failure counts (relative to the uniform
+    prior) in two fixed-width bit fields wide enough to count up to `horizon`
+    pulls, so updating one arm is a single integer addition and beliefs
+    hash as plain ints.
+    '''
+
+    def __init__(self, actions, horizon, rng=None):
+        super().__init__(actions, rng)
+        self.horizon = horizon
+        self._bits = max(1, horizon.bit_length())
+        self._mask = (1 << self._bits) - 1
+        self._shifts = [i * self._bits for i in range(2 * actions)]
+        self._units = [1 << shift for shift in self._shifts]
+
+    @property
+    def start(self):
+        '''Uniform prior'''
+        return 0
+
+    def arm(self, belief, action):
+        successes = (belief >> self._shifts[2 * action]) & self._mask
+        failures = (belief >> self._shifts[2 * action + 1]) & self._mask
+        return (successes + 1, failures + 1)
+
+    def arms(self, belief):
+        return tuple(self.arm(belief, action) for action in range(self.actions))
+
+    def update(self, belief, action, reward):
+        return belief + self._units[2 * action + 1 - int(reward)]
+
+    def update_batch(self, belief, actions, rewards):
+        for action, (successes, failures) in enumerate(self._outcomes(actions, rewards)):
+            belief += successes * self._units[2 * action] + failures * self._units[2 * action + 1]
+        return belief
+
+    def canonical(self, belief):
+        params = self.arms(belief)
+        order = sorted(range(self.actions), key=params.__getitem__)
+        return self.pack(params[i] for i in order), order
+
+    def pack(self, params):
+        '''Encodes a tuple of (alpha, beta) parameters.'''
+        belief = 0
+        for action, (alpha, beta) in enumerate(params):
+            belief += (alpha - 1) * self._units[2 * action] + (beta - 1) * self._units[2 * action + 1]
+        return belief
+
+
+def make_mdp(actions, horizon, packed=False, rng=None):
+    if packed:
+        return PackedBetaBernoulliMDP(actions, horizon, rng)
+    return BetaBernoulliMDP(actions, rng)
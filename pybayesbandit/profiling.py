@@ -0,0 +1,162 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners import Learner
+
+from collections import Counter
+import json
+import os
+import threading
+import time
+
+
+# The active Profiler, or None when profiling is disabled. Hot paths check
+# `profiling.PROFILE is not None` before counting anything, so disabled
+# instrumentation costs one module attribute lookup.
+PROFILE = None
+
+
+def enable():
+    '''Starts collecting counters and timings in a new Profiler.'''
+    global PROFILE
+    PROFILE = Profiler()
+    return PROFILE
+
+
+def disable():
+    global PROFILE
+    profile, PROFILE = PROFILE, None
+    return profile
+
+
+class Profiler():
+    '''
+    Named event counters plus a timeline of spans, split into episodes.
+
+    Counters are free-form dotted names (e.g. 'mcts.trials'). Spans are
+    kept as Chrome trace events, which chrome://tracing and Perfetto load.
+    '''
+
+    def __init__(self):
+        self.counters = Counter()
+        self.episodes = []
+        self.events = []
+        self._episode = Counter()
+        self._origin = time.perf_counter()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def now(self):
+        return time.perf_counter()
+
+    def span(self, name, start, end, args=None):
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def end_episode(self):
+        '''Closes the current episode, recording its counter deltas.'''
+        delta = self.counters - self._episode
+        self._episode = self.counters.copy()
+        if delta:
+            self.episodes.append(dict(delta))
+            self.events.append({
+                'name': 'counters',
+                'ph': 'C',
+                'ts': (self.now() - self._origin) * 1e6,
+                'pid': os.getpid(),
+                'args': dict(delta),
+            })
+
+    def summary(self):
+        '''Returns the total and per-episode mean of each counter.'''
+        episodes = max(len(self.episodes), 1)
+        return {
+            name: {'total': total, 'per_episode': total / episodes}
+            for name, total in sorted(self.counters.items())
+        }
+
+    def save_trace(self, filename):
+        with open(filename, 'w') as file:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, file)
+
+
+class InstrumentedLearner(Learner):
+    '''
+    Wraps a learner and records the time spent in its decisions and
+    updates, with the counters incremented by each decision.
+    '''
+
+    def __init__(self, learner, profile):
+        self.learner = learner
+        self.profile = profile
+
+    def __call__(self):
+        profile = self.profile
+        before = profile.counters.copy()
+        start = profile.now()
+        action = self.learner()
+        end = profile.now()
+        profile.span('act', start, end, dict(profile.counters - before))
+        profile.count('learner.calls')
+        profile.count('learner.call_seconds', end - start)
+        return action
+
+    def update(self, action, reward):
+        profile = self.profile
+        start = profile.now()
+        self.learner.update(action, reward)
+        end = profile.now()
+        profile.count('learner.updates')
+        profile.count('learner.update_seconds', end - start)
+        profile.span('update', start, end)
+
+    def act(self):
+        profile = self.profile
+        before = profile.counters.copy()
+        start = profile.now()
+        action = self.learner.act()
+        end = profile.now()
+        profile.span('act', start, end, dict(profile.counters - before))
+        profile.count('learner.calls')
+        profile.count('learner.call_seconds', end - start)
+        return action
+
+    def update_batch(self, actions, rewards):
+        profile = self.profile
+        start = profile.now()
+        self.learner.update_batch(actions, rewards)
+        end = profile.now()
+        profile.count('learner.updates', len(actions))
+        profile.count('learner.update_seconds', end - start)
+        profile.span('update', start, end)
+
+    def reset(self):
+        if self.profile.counters:
+            self.profile.end_episode()
+        self.learner.reset()
+
+    def batch(self, N):
+        return self.learner.batch(N)
@@ -0,0 +1,105 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+import importlib
+
+
+class Registry():
+    '''
+    Maps names to classes given as 'module:Class' paths, importing each
+    module only when its name is first looked up.
+
+    Third-party packages can add entries with `register` or through the
+    'pybayesbandit.<kind>s' entry point group (e.g. 'pybayesbandit.learners'),
+    which is only scanned for names that are not registered otherwise.
+    '''
+
+    def __init__(self, kind, entries):
+        self.kind = kind
+        self._entries = dict(entries)
+        self._plugins = False
+
+    def register(self, name, target):
+        '''Registers a class, or a 'module:Class' path to import on use.'''
+        self._entries[name] = target
+
+    def builtins(self):
+        return list(self._entries)
+
+    def names(self):
+        self._load_plugins()
+        return list(self._entries)
+
+    def __contains__(self, name):
+        if name not in self._entries:
+            self._load_plugins()
+        return name in self._entries
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise ValueError('unknown {} {!r} (expected one of: {})'.format(self.kind, name, ', '.join(self._entries)))
+        target = self._entries[name]
+        if isinstance(target, str):
+            module, _, attr = target.partition(':')
+            target = getattr(importlib.import_module(module), attr)
+            self._entries[name] = target
+        return target
+
+    def _load_plugins(self):
+        if self._plugins:
+            return
+        self._plugins = True
+        from importlib.metadata import entry_points
+        group = 'pybayesbandit.{}s'.format(self.kind)
+        try:
+            entries = entry_points(group=group)
+        except TypeError: # Python < 3.10
+            entries = entry_points().get(group, [])
+        for entry in entries:
+            self._entries.setdefault(entry.name, entry.value)
+
+
+LEARNERS = Registry('learner', {
+    'random': 'pybayesbandit.learners.random:RandomPolicy',
+    'ucb': 'pybayesbandit.learners.ucb:UCBPolicy',
+    'thompson': 'pybayesbandit.learners.thompson:ThompsonSamplingPolicy',
+    'vi': 'pybayesbandit.learners.vi:BetaBernoulliVIPolicy',
+    'uct': 'pybayesbandit.learners.uct:BetaBernoulliUCTPolicy',
+    'rollout': 'pybayesbandit.learners.rollout:RolloutPolicy',
+    'aotree': 'pybayesbandit.learners.lookahead:LookaheadTreeSearchPolicy',
+    'gittins': 'pybayesbandit.learners.gittins:GittinsIndexPolicy',
+})
+
+BANDITS = Registry('bandit', {
+    'bernoulli': 'pybayesbandit.bandits.bernoulli:BernoulliBandit',
+})
+
+GAMES = Registry('game', {
+    'total': 'pybayesbandit.games.totalregret:TotalRegretGame',
+    'simple': 'pybayesbandit.games.simpleregret:SimpleRegretGame',
+})
+
+
+def register_learner(name, target):
+    LEARNERS.register(name, target)
+
+
+def register_bandit(name, target):
+    BANDITS.register(name, target)
+
+
+def register_game(name, target):
+    GAMES.register(name, target)
@@ -0,0 +1,88 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+
+class RandomSource():
+    '''
+    Random numbers for bandits, learners and planners.
+
+    Scalar uniforms (and the integers and Bernoulli draws derived from them)
+    are drawn from a numpy.random.Generator in blocks of `block` values and
+    handed out one at a time as Python floats, so scalar draws do not pay a
+    call into NumPy each. Array draws go to the generator directly.
+    '''
+
+    def __init__(self, seed=None, block=4096):
+        self.block = block
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        self.generator = np.random.default_rng(seed)
+        self._uniforms = iter(())
+
+    def uniform(self):
+        '''Returns a uniform float in [0, 1).'''
+        u = next(self._uniforms, None)
+        if u is None:
+            self._uniforms = iter(self.generator.random(self.block).tolist())
+            u = next(self._uniforms)
+        return u
+
+    def integer(self, high):
+        '''Returns a uniform int in [0, high).'''
+        return int(self.uniform() * high)
+
+    def bernoulli(self, p):
+        '''Returns 1 with probability p, or an array of draws if p is one.'''
+        if isinstance(p, np.ndarray):
+            return (self.generator.random(p.shape) < p).astype(np.int64)
+        return int(self.uniform() < p)
+
+    def uniforms(self, size):
+        return self.generator.random(size)
+
+    def integers(self, high, size):
+        return self.generator.integers(0, high, size=size)
+
+    def beta(self, alpha, beta):
+        '''Returns a Beta draw, or one per entry of `alpha` and `beta` arrays.'''
+        return self.generator.beta(alpha, beta)
+
+
+class DefaultRandomSource(RandomSource):
+    '''
+    The process-wide source used by components built without one. It
+    pickles by reference, so copies of a component sent to a worker
+    process share that process's default source, which `reseed` controls.
+    '''
+
+    def __reduce__(self):
+        return (default_source, ())
+
+
+_default = DefaultRandomSource()
+
+
+def default_source():
+    return _default
+
+
+def reseed(seed):
+    '''Reseeds the default source and, for third-party code, np.random.'''
+    _default.seed(seed)
+    np.random.seed(seed)
@@ -13,41 +13,126 @@
 # You should have received a copy of the GNU General Public License
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
+from pybayesbandit import profiling
+
 import abc
 import sys
+import time
+
+
+class _DeadlineExceeded(Exception):
+    pass
 
 
 class AOTreeSearch(metaclass=abc.ABCMeta):
 
-    def __init__(self, mdp):
+    def __init__(self, mdp, symmetric=False, reuse=False):
         self.mdp = mdp
+        self.symmetric = symmetric
+        self.reuse = reuse
+        self.V = {}
+        # (depth, state) tables of the searches with each leaf pull count
+        self._levels = {}
+        self.deadline = None
+        self.depth_reached = None
+        self._offset = None
 
     @abc.abstractmethod
     def heuristic(self, state):
         raise NotImplementedError
 
-    def __call__(self, start, max_depth, horizon):
-        self.V = {}
-        self.max_depth = max_depth
+    def __call__(self, start, max_depth, horizon, deadline=None):
+        '''
+        Returns the best action from `start` searching `max_depth` steps
+        ahead. Given a `deadline` (a time.perf_counter() value), deepens
+        iteratively from depth 1 instead and returns the action of the
+        deepest search completed by then; depth 1 always completes. The depth
+        searched is kept in `self.depth_reached`.
+        '''
+        # cached values assume horizon + pulls(start) stays constant, which
+        # pending actions (see Learner.act) break
+        pulls = self.mdp.pulls(start)
+        if self.reuse and horizon + pulls == self._offset:
+            self.evict(start, max_depth, min_depth=None if deadline is None else 1)
+        else:
+            self._levels = {}
+        self._offset = horizon + pulls
         self.horizon = horizon
-        action, _ = self.or_node(start, max_depth)
+
+        if deadline is None:
+            self.max_depth = max_depth
+            self.V = self._levels.setdefault(pulls + max_depth, {})
+            action, _ = self.or_node(start, max_depth)
+            self.depth_reached = max_depth
+            return action
+
+        action = None
+        for depth in range(1, max_depth + 1):
+            self.max_depth = depth
+            self.V = self._levels.setdefault(pulls + depth, {})
+            self.deadline = deadline if depth > 1 else None
+            try:
+                action, _ = self.or_node(start, depth)
+            except _DeadlineExceeded:
+                break
+            self.depth_reached = depth
+        self.deadline = None
+        if profiling.PROFILE is not None:
+            profiling.PROFILE.count('aotree.depth', self.depth_reached)
         return action
 
+    def reset(self):
+        self.V = {}
+        self._levels = {}
+
+    def evict(self, start, max_depth, min_depth=None):
+        '''
+        Drops the cached values that a search from `start` can no longer use.
+
+        Values are kept in one table per leaf pull count (the pull count of
+        a state plus its remaining depth), which never decreases along an
+        episode. Iterative deepening searches every depth from `min_depth`
+        to `max_depth`, and so every leaf pull count in between; the tables
+        of all other leaf pull counts are dropped. Entries unreachable from
+        `start` stay until their table is dropped.
+
+        Without a deadline each search's leaf pull count is one more than
+        the previous one's, so values are only reused once the depth is
+        clamped by the remaining horizon. With a deadline, the previous
+        decision's table answers the whole depth-(d-1) pass of the next one.
+        '''
+        pulls = self.mdp.pulls(start)
+        low = pulls + (max_depth if min_depth is None else min_depth)
+        high = pulls + max_depth
+        self._levels = {level: V for level, V in self._levels.items() if low <= level <= high}
+
     def or_node(self, state, depth):
         if depth == 0:
             return self.heuristic(state)
 
+        if self.symmetric:
+            state, order = self.mdp.canonical(state)
+
         if (depth, state) in self.V:
-            return self.V[(depth, state)]
+            best_action, best_value = self.V[(depth, state)]
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('aotree.V.hits')
+        else:
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('aotree.V.misses')
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise _DeadlineExceeded
+            best_action, best_value = None, -sys.maxsize
+            for action in range(self.mdp.actions):
+                Q = self.and_node(state, action, depth)
+                if Q > best_value:
+                    best_action = action
+                    best_value = Q
 
-        best_action, best_value = None, -sys.maxsize
-        for action in range(self.mdp.actions):
-            Q = self.and_node(state, action, depth)
-            if Q > best_value:
-                best_action = action
-                best_value = Q
+            self.V[(depth, state)] = (best_action, best_value)
 
-        self.V[(depth, state)] = (best_action, best_value)
+        if self.symmetric:
+            best_action = order[best_action]
 
         return (best_action, best_value)
 
@@ -0,0 +1,320 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+import abc
+import os
+import pickle
+import sqlite3
+import tempfile
+
+
+_MISSING = object()
+
+
+class Cache(metaclass=abc.ABCMeta):
+    '''Bounded mapping that counts hits, misses and evictions.'''
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put(self, key, value):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+
+class LRUCache(Cache):
+    '''
+    Mapping of at most `capacity` entries (None for no limit) that evicts
+    the least recently used entries when full.
+
+    Recency is tracked per generation rather than per entry, so that a hit
+    costs a single dict lookup: new entries go to the recent generation,
+    which becomes the old one once it holds capacity/2 entries, dropping the
+    previous old generation. A hit in the old generation moves the entry
+    back to the recent one, so an entry is kept as long as it is used at
+    least once every capacity/2 insertions.
+    '''
+
+    def __init__(self, capacity=None):
+        super().__init__(capacity)
+        self._half = None if capacity is None else capacity // 2
+        self._recent = {}
+        self._old = {}
+
+    def __len__(self):
+        return len(self._recent) + len(self._old)
+
+    def __contains__(self, key):
+        return key in self._recent or key in self._old
+
+    def get(self, key, default=None):
+        value = self._recent.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._old.pop(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.put(key, value)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        recent = self._recent
+        if self._half is not None and len(recent) >= self._half:
+            if self._half == 0:
+                return
+            self._evict(self._old)
+            self._old = recent
+            self._recent = recent = {}
+        recent[key] = value
+
+    def _evict(self, entries):
+        self.evictions += len(entries)
+
+    def clear(self):
+        self._recent = {}
+        self._old = {}
+
+
+class LayerCache(Cache):
+    '''
+    Mapping of at most `capacity` values keyed on (steps to go, state), for
+    recursive solvers. When full it drops a whole layer and stops caching
+    it: the layer with the fewest steps to go whose loss leaves no more
+    than `gap` consecutive uncached layers, raising `gap` only when no
+    such layer is left. In a belief MDP the layers with few steps to go
+    hold the most states, and a value is recomputed from cached values at
+    most `gap` layers below it, so thinning the layers costs a factor of
+    about (outcomes x actions)^gap, where dropping every layer below a
+    floor costs one exponential in the floor. Per-entry recency does not
+    suit a depth-first solve, where evicting a value high in the tree
+    forces its whole subtree to be solved again.
+
+    Any capacity solves, but gap grows with the share of states that must
+    go, and the solve time with it. Below about a quarter of the states,
+    SpillCache is the better fit.
+    '''
+
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.gap = 1
+        self._layers = {}
+        self._dropped = set()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        layer = self._layers.get(key[0])
+        return layer is not None and key in layer
+
+    def get(self, key, default=None):
+        layer = self._layers.get(key[0])
+        if layer is not None:
+            value = layer.get(key, _MISSING)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        steps = key[0]
+        if steps in self._dropped:
+            return
+        layer = self._layers.get(steps)
+        if layer is None:
+            layer = self._layers[steps] = {}
+        if key not in layer:
+            self._size += 1
+        layer[key] = value
+        while self._size > self.capacity:
+            self._drop()
+
+    def _run(self, steps):
+        '''Consecutive uncached layers around `steps` if it were dropped.'''
+        below = steps - 1
+        while below in self._dropped:
+            below -= 1
+        above = steps + 1
+        while above in self._dropped:
+            above += 1
+        return above - below - 1
+
+    def _drop(self):
+        while True:
+            for steps in sorted(self._layers):
+                if self._run(steps) <= self.gap:
+                    dropped = self._layers.pop(steps)
+                    self._dropped.add(steps)
+                    self._size -= len(dropped)
+                    self.evictions += len(dropped)
+                    return
+            self.gap += 1
+
+    def clear(self):
+        self.gap = 1
+        self._layers = {}
+        self._dropped = set()
+        self._size = 0
+
+
+class SpillCache(LRUCache):
+    '''
+    LRUCache that writes evicted entries to a temporary SQLite file in
+    directory `path` instead of dropping them, and reads them back into
+    memory on a miss. Only `capacity` entries are kept in memory, but no
+    entry is ever lost.
+
+    Keys are stored by repr, so they must be built from plain values
+    (ints, floats, strings and tuples of them), and values are pickled.
+    The hashes of spilled keys are kept in memory, so that misses on keys
+    that were never spilled do not query the file. Copies sent to other
+    processes reopen the same file; the file is removed when the original
+    is closed or garbage collected.
+    '''
+
+    def __init__(self, capacity, path):
+        if capacity < 2:
+            raise ValueError('spill cache capacity must be at least 2')
+        super().__init__(capacity)
+        os.makedirs(path, exist_ok=True)
+        fd, self.filename = tempfile.mkstemp(prefix='spill-', suffix='.sqlite', dir=path)
+        os.close(fd)
+        self._owner = os.getpid()
+        self.spilled = 0
+        self.disk_hits = 0
+        self._hashes = set()
+        self._db = sqlite3.connect(self.filename, timeout=60)
+        self._db.execute('CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB)')
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if hash(key) not in self._hashes:
+            return default
+        row = self._db.execute('SELECT value FROM entries WHERE key = ?', (repr(key),)).fetchone()
+        if row is None:
+            return default
+        value = pickle.loads(row[0])
+        self.misses -= 1
+        self.hits += 1
+        self.disk_hits += 1
+        self.put(key, value)
+        return value
+
+    def _evict(self, entries):
+        super()._evict(entries)
+        # entries read back from disk are written again, which is harmless
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?)',
+                ((repr(key), pickle.dumps(value)) for key, value in entries.items()))
+        self._hashes.update(map(hash, entries))
+        self.spilled += len(entries)
+
+    def clear(self):
+        super().clear()
+        self._hashes = set()
+        with self._db:
+            self._db.execute('DELETE FROM entries')
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            if os.getpid() == self._owner and os.path.exists(self.filename):
+                os.remove(self.filename)
+
+    def __del__(self):
+        if getattr(self, '_db', None) is not None:
+            self.close()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_db'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._db = sqlite3.connect(self.filename, timeout=60)
+
+    def stats(self):
+        return dict(super().stats(), spilled=self.spilled, disk_hits=self.disk_hits)
+
+
+_shared = {}
+
+
+def shared_cache(name, capacity=None):
+    '''Returns the process-wide cache called `name`, creating it on first use.'''
+    if name not in _shared:
+        _shared[name] = LRUCache(capacity)
+    return _shared[name]
+
+
+def heuristic_cache(kind, mdp, horizon, params, default=2**16):
+    '''
+    Returns the leaf value cache of a planner over `mdp`, bounded by
+    params.cache_size entries (`default` if unset, None if 0): a cache of
+    its own, or with params.shared_cache the cache shared by all planners of
+    the same kind over the same belief MDP in this process.
+    '''
+    capacity = getattr(params, 'cache_size', None)
+    if capacity is None:
+        capacity = default
+    if capacity == 0:
+        return None
+    if getattr(params, 'shared_cache', False):
+        return shared_cache(cache_name(kind, mdp, horizon), capacity)
+    return LRUCache(capacity)
+
+
+def cache_name(kind, mdp, horizon):
+    # packed beliefs of MDPs with different arms or horizons may collide
+    return (kind, type(mdp).__name__, mdp.actions, horizon)
@@ -13,43 +13,108 @@
 # You should have received a copy of the GNU General Public License
 # along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
-import abc
-import sys
-
-
-class Node():
-
-    def __init__(self, state, action=None, visits=0.0, value=0.0, succ=None):
-        self.state = state
-        self.action = action
-        self.visits = visits
-        self.value = value
-        self.succ = succ if succ is not None else []
-
-    def is_decision(self):
-        return self.action is None
-
-    def is_chance(self):
-        return self.action is not None
+from pybayesbandit import profiling
 
-    def is_leaf(self):
-        return self.succ == []
-
-    def __hash__(self):
-        return hash((self.state, self.action))
-
-    def __eq__(self, other):
-        return self.state == other.state and self.action == other.action
-
-    def __repr__(self):
-        return 'Node(state={}, action={}, visits={}, value={}, succ={})'.format(self.state, self.action, self.visits, self.value, self.succ)
+import abc
+import numpy as np
+import time
+
+
+class NodePool():
+    '''
+    Struct-of-arrays store of MCTS decision nodes and their chance nodes.
+
+    Decision node i owns the chance nodes (i, a), one per action. Visit
+    counts and values of both kinds live in preallocated arrays that double
+    in size when full. `children[i, a, o]` is the decision node reached from
+    chance node (i, a) with outcome o (-1 until first reached). Beliefs
+    transpose, so a node may be reached from several chance nodes, and
+    `index` maps each belief to its node.
+    '''
+
+    ARRAYS = ['visits', 'values', 'expanded', 'chance_visits', 'chance_values', 'children']
+
+    def __init__(self, actions, outcomes=2, capacity=1024):
+        self.actions = actions
+        self.outcomes = outcomes
+        self.size = 0
+        self.index = {}
+        self.states = []
+        self.visits = np.zeros(capacity)
+        self.values = np.zeros(capacity)
+        self.expanded = np.zeros(capacity, dtype=bool)
+        self.chance_visits = np.zeros([capacity, actions])
+        self.chance_values = np.zeros([capacity, actions])
+        self.children = np.full([capacity, actions, outcomes], -1, dtype=np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def get(self, state):
+        return self.index.get(state)
+
+    def add(self, state):
+        if self.size == len(self.visits):
+            self._resize(2 * self.size)
+        node = self.size
+        self.size += 1
+        self.index[state] = node
+        self.states.append(state)
+        return node
+
+    def child(self, node, action, outcome, state):
+        '''Returns the decision node of `state`, reached from (node, action) with `outcome`.'''
+        child = self.index.get(state)
+        if child is None:
+            child = self.add(state)
+        self.children[node, action, outcome] = child
+        return child
+
+    def keep(self, mask):
+        '''Compacts the pool to the decision nodes selected by `mask`.'''
+        kept = np.flatnonzero(mask)
+        # new index of each old node, and -1 (the last entry) for dropped ones
+        renumber = np.full(self.size + 1, -1, dtype=np.int64)
+        renumber[kept] = np.arange(len(kept))
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:len(kept)] = array[kept]
+            if name == 'children':
+                array[:len(kept)] = renumber[array[:len(kept)]]
+                array[len(kept):self.size] = -1
+            else:
+                array[len(kept):self.size] = 0
+        self.states = [self.states[node] for node in kept]
+        self.index = {state: node for node, state in enumerate(self.states)}
+        self.size = len(kept)
+
+    def decay(self, factor):
+        '''Scales visit counts by `factor`, keeping visited nodes at one visit or more.'''
+        for name in ['visits', 'chance_visits']:
+            array = getattr(self, name)[:self.size]
+            np.maximum(array * factor, np.minimum(array, 1), out=array)
+
+    def _resize(self, capacity):
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            fill = -1 if name == 'children' else 0
+            resized = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            resized[:self.size] = array[:self.size]
+            setattr(self, name, resized)
 
 
 class MCTS(metaclass=abc.ABCMeta):
 
-    def __init__(self, mdp):
+    # return backed up by a virtual loss: rewards are posterior means, so no
+    # trial returns less than 0
+    virtual_loss = 0.0
+
+    def __init__(self, mdp, symmetric=False, decay=1.0):
         self.mdp = mdp
-        self.nodes = {}
+        self.symmetric = symmetric
+        self.decay = decay
+        self.nodes = NodePool(mdp.actions, mdp.outcomes)
+        self._root = None
 
     @abc.abstractmethod
     def tree_policy(self, node):
@@ -60,89 +125,243 @@ class MCTS(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def init_q_value(self, node, d):
+    def init_q_value(self, state, action, d):
         raise NotImplementedError
 
     @abc.abstractmethod
     def heuristic(self, state):
         raise NotImplementedError
 
-    def __call__(self, start, max_depth, horizon, trials, C=2):
+    def __call__(self, start, max_depth, horizon, trials, C=2, batch=1, deadline=None):
+        visits, values = self.search(start, max_depth, horizon, trials, C, batch, deadline)
+        return int(np.argmax(values))
+
+    def search(self, start, max_depth, horizon, trials, C=2, batch=1, deadline=None):
+        '''
+        Runs `trials` trials from `start` and returns the per-action visits
+        and values of the root. With batch > 1 trials are run leaf-parallel
+        in groups of `batch` descents.
+
+        Given a `deadline` (a time.perf_counter() value), trials stop once it
+        has passed, after at least one trial (or batch), and `trials` is only
+        an upper bound, which may be None. The number of trials run is kept
+        in `self.trials_run`.
+        '''
+        assert trials is not None or deadline is not None, 'trials or deadline required'
         self.max_depth = max_depth
         self.horizon = horizon
 
-        n0 = Node(start)
-        self.nodes[n0] = n0
-
-        for i in range(trials):
-            self._trial(n0, max_depth, C)
-
-        best_q_value = -sys.maxsize
-        best_action_node = None
-        for a in n0.succ:
-            if a.value > best_q_value:
-                best_q_value = a.value
-                best_action_node = a
-
-        return best_action_node.action
+        if self.symmetric:
+            start, order = self.mdp.canonical(start)
+
+        self.prune(start)
+
+        n0 = self.nodes.get(start)
+        if n0 is None:
+            n0 = self.nodes.add(start)
+
+        if deadline is None:
+            if batch > 1:
+                for i in range(0, trials, batch):
+                    self._batched_trials(n0, max_depth, C, min(batch, trials - i))
+            else:
+                for i in range(trials):
+                    self._trial(n0, max_depth, C)
+            self.trials_run = trials
+        else:
+            clock = time.perf_counter
+            n = 0
+            while trials is None or n < trials:
+                if batch > 1:
+                    b = batch if trials is None else min(batch, trials - n)
+                    self._batched_trials(n0, max_depth, C, b)
+                    n += b
+                else:
+                    self._trial(n0, max_depth, C)
+                    n += 1
+                if clock() >= deadline:
+                    break
+            self.trials_run = n
+
+        if profiling.PROFILE is not None:
+            profiling.PROFILE.count('mcts.searches')
+            profiling.PROFILE.count('mcts.trials', self.trials_run)
+
+        visits = self.nodes.chance_visits[n0].copy()
+        values = self.nodes.chance_values[n0].copy()
+
+        if self.symmetric:
+            visits[order], values[order] = visits.copy(), values.copy()
+
+        return visits, values
+
+    def init_q_values(self, states, actions, depths):
+        return np.array([self.init_q_value(s, a, d) for s, a, d in zip(states, actions, depths)])
+
+    def prune(self, start):
+        '''
+        Drops decision nodes that are unreachable from `start`.
+
+        The returns backed up in a kept node were truncated `max_depth`
+        steps below an earlier root, so they cover fewer steps than the
+        returns of searches from `start` and are biased low (by about one
+        step's reward per root advance). When the root advances, visit
+        counts are therefore scaled by `decay` (1 keeps them as they are, 0
+        keeps the stale values with the weight of a single visit).
+        '''
+        pulls = self.mdp.pulls(start)
+        mask = [
+            self.mdp.pulls(state) >= pulls
+            and (self.symmetric or self.mdp.descends(state, start))
+            for state in self.nodes.states
+        ]
+        self.nodes.keep(np.array(mask, dtype=bool))
+        if start != self._root and self.decay != 1.0:
+            self.nodes.decay(self.decay)
+        self._root = start
 
     def _trial(self, node, depth, C):
-        r = 0.0
+        nodes = self.nodes
         if depth == 0:
-            return self.heuristic(node.state)
-
-        if node.is_decision():
-
-            if node.is_leaf(): # expand decision node
-                for action in range(self.mdp.actions):
-                    succ_node = Node(node.state, action)
-                    node.succ.append(succ_node)
-                next_node = node.succ[0]
-            else: # traverse tree
-                next_node = self.tree_policy(node, C)
+            return self.heuristic(nodes.states[node])
 
-        else: # node.is_chance() == True
+        if not nodes.expanded.item(node): # expand decision node
+            nodes.expanded[node] = True
+            action = 0
+            if profiling.PROFILE is not None:
+                profiling.PROFILE.count('mcts.expansions')
+        else: # traverse tree
+            action = int(self.tree_policy(node, C))
 
-            if node.visits == 0: # initialize leaf node and backup
-                # r = self._rollout(node.state, node.action, depth)
-                r = self.init_q_value(node, depth)
-                node.visits = 1
-                node.value = r
-                return r
-            else: # traverse tree
-
-                state = node.state
-                action = node.action
-                next_state = self.mdp.sample(state, action)
-                r = self.mdp.reward(state, action, next_state)
-
-                next_node = Node(next_state)
-                if next_node in self.nodes: # traverse tree
-                    next_node = self.nodes[next_node]
-                else: # expand chance node
-                    self.nodes[next_node] = next_node
-
-                depth -= 1
-
-        r += self._trial(next_node, depth, C)
-        self._backup(node, r)
+        r = self._chance_trial(node, action, depth, C)
+        self._backup_decision(node, r)
 
         return r
 
-    # def _rollout(self, state, action, depth):
-    #     total = 0.0
+    def _chance_trial(self, node, action, depth, C):
+        nodes = self.nodes
+        state = nodes.states[node]
 
-    #     next_state = self.mdp.sample(state, action)
-    #     total += self.mdp.reward(state, action, next_state)
+        if nodes.chance_visits.item(node, action) == 0: # initialize leaf node and backup
+            r = self.init_q_value(state, action, depth)
+            nodes.chance_visits[node, action] = 1
+            nodes.chance_values[node, action] = r
+            return r
 
-    #     for step in range(depth-1):
-    #         state = next_state
-    #         action = self.default_policy(state)
-    #         next_state = self.mdp.sample(state, action)
-    #         total += self.mdp.reward(state, action, next_state)
+        # traverse tree
+        next_node = self._next(node, state, action)
+        r = self.mdp.reward(state, action, nodes.states[next_node])
+        r += self._trial(next_node, depth - 1, C)
+        self._backup_chance(node, action, r)
 
-    #     return total
+        return r
 
-    def _backup(self, node, r):
-        node.visits += 1
-        node.value += 1 / node.visits * (r - node.value)
+    def _next(self, node, state, action):
+        '''Samples a transition from chance node (node, action) and returns the next decision node.'''
+        outcome = self.mdp.outcome(state, action)
+        next_node = self.nodes.children.item(node, action, outcome)
+        if next_node < 0: # expand chance node
+            next_state = self.mdp.update(state, action, outcome)
+            if self.symmetric:
+                next_state, _ = self.mdp.canonical(next_state)
+            next_node = self.nodes.child(node, action, outcome, next_state)
+        return next_node
+
+    def _batched_trials(self, root, depth, C, batch):
+        '''
+        Runs `batch` trials as one leaf-parallel step.
+
+        Each descent applies a virtual loss on its path, so the following
+        descents spread over other branches. Leaves are then evaluated
+        together, the virtual losses are undone and the real returns are
+        backed up in descent order.
+        '''
+        nodes = self.nodes
+        descents = []
+        saved = []
+
+        for b in range(batch):
+            node, d = root, depth
+            path, rewards = [], []
+            while d > 0:
+                if not nodes.expanded[node]:
+                    nodes.expanded[node] = True
+                    action = 0
+                    if profiling.PROFILE is not None:
+                        profiling.PROFILE.count('mcts.expansions')
+                else:
+                    action = int(self.tree_policy(node, C))
+
+                path.append((node, action))
+                saved.append((node, action,
+                    nodes.visits[node], nodes.chance_visits[node, action], nodes.chance_values[node, action]))
+                leaf = nodes.chance_visits[node, action] == 0
+                self._virtual_loss(node, action)
+                if leaf:
+                    break
+
+                state = nodes.states[node]
+                next_node = self._next(node, state, action)
+                rewards.append(self.mdp.reward(state, action, nodes.states[next_node]))
+                node = next_node
+                d -= 1
+
+            descents.append((path, rewards, node, d))
+
+        init = [i for i, (path, rewards, _, _) in enumerate(descents) if len(path) > len(rewards)]
+        leaf_values = [None] * batch
+        if init:
+            q_values = self.init_q_values(
+                [nodes.states[descents[i][2]] for i in init],
+                [descents[i][0][-1][1] for i in init],
+                [descents[i][3] for i in init])
+            for i, q in zip(init, q_values):
+                leaf_values[i] = q
+
+        for node, action, visits, chance_visits, chance_value in reversed(saved):
+            nodes.visits[node] = visits
+            nodes.chance_visits[node, action] = chance_visits
+            nodes.chance_values[node, action] = chance_value
+
+        for (path, rewards, node, d), r in zip(descents, leaf_values):
+            if r is None:
+                r = self.heuristic(nodes.states[node])
+            else:
+                node, action = path.pop()
+                if nodes.chance_visits[node, action] == 0:
+                    nodes.chance_visits[node, action] = 1
+                    nodes.chance_values[node, action] = r
+                else:
+                    self._backup_chance(node, action, r)
+                self._backup_decision(node, r)
+
+            for (node, action), reward in zip(reversed(path), reversed(rewards)):
+                r += reward
+                self._backup_chance(node, action, r)
+                self._backup_decision(node, r)
+
+    def _virtual_loss(self, node, action):
+        '''
+        Counts a pending descent through (node, action) as a visit that
+        returned `virtual_loss`. Besides raising the visit counts, which
+        shrinks the exploration bonus, this pulls the chance node's value
+        towards the lowest return a trial can have, so the next descents
+        of the batch prefer other actions.
+        '''
+        nodes = self.nodes
+        nodes.visits[node] += 1
+        self._backup_chance(node, action, self.virtual_loss)
+
+    def _backup_decision(self, node, r):
+        nodes = self.nodes
+        visits = nodes.visits.item(node) + 1
+        value = nodes.values.item(node)
+        nodes.visits[node] = visits
+        nodes.values[node] = value + (r - value) / visits
+
+    def _backup_chance(self, node, action, r):
+        nodes = self.nodes
+        visits = nodes.chance_visits.item(node, action) + 1
+        value = nodes.chance_values.item(node, action)
+        nodes.chance_visits[node, action] = visits
+        nodes.chance_values[node, action] = value + (r - value) / visits
@@ -0,0 +1,331 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit import registry
+from pybayesbandit.learners import Learner
+
+import asyncio
+import json
+import os
+import signal
+import time
+import types
+
+import numpy as np
+
+
+def parse_address(address):
+    '''Parses 'unix:PATH' or 'HOST:PORT' into ('unix', PATH) or ('tcp', (HOST, PORT)).'''
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or 'localhost', int(port))
+
+
+class DecisionServer():
+    '''
+    Hosts named learner sessions of any registered learner type behind a
+    JSON-lines protocol. Each request line is answered by one response line,
+    in order, echoing the request's "id" if given:
+
+        {"op": "create", "session": S, "learner": "thompson", "actions": K,
+         "horizon": T, "params": {...}}                            -> {"ok": true}
+        {"op": "act", "session": S}                                -> {"action": A}
+        {"op": "reward", "session": S, "action": A, "reward": R}   -> {"ok": true}
+        {"op": "rewards", "session": S, "actions": [A, ...],
+         "rewards": [R, ...]}                                      -> {"ok": true}
+        {"op": "reset", "session": S}                              -> {"ok": true}
+        {"op": "close", "session": S}                              -> {"ok": true}
+        {"op": "stats"}                                            -> {"sessions": ...}
+
+    Failed requests are answered with {"error": message}. Sessions need a
+    horizon, over which planning learners solve; rewards are 0 or 1.
+
+    Actions are chosen with `Learner.act`, so a session may act several
+    times before the rewards of earlier actions arrive.
+
+    `act` requests that arrive in the same event loop iteration, or within
+    `batch_delay` seconds of the first one, are answered together with one
+    `Learner.act_many` call per learner class, which Thompson sampling and
+    UCB vectorize over sessions. Learners without a vectorized `act_many`
+    decide in the loop's default executor instead, so that their searches
+    do not hold up other sessions, one request at a time per session.
+    '''
+
+    def __init__(self, batch_delay=0.0, max_batch=1024):
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.sessions = {}
+        self._locks = {}
+        self.acts = 0
+        self.batches = 0
+        self._pending = []
+        self._flush_handle = None
+
+    def _session(self, name):
+        if name not in self.sessions:
+            raise ValueError('unknown session {!r}'.format(name))
+        return self.sessions[name]
+
+    async def create(self, name, learner, actions, horizon, params=None):
+        '''
+        Creates a session. Learners that solve at construction (vi, gittins)
+        are built in the loop's default executor, so other sessions are
+        served meanwhile.
+        '''
+        if name in self.sessions:
+            raise ValueError('session {!r} already exists'.format(name))
+        if horizon < 1:
+            raise ValueError('session horizon must be at least 1')
+        policy = registry.LEARNERS[learner]
+        params = types.SimpleNamespace(**(params or {}))
+        learner = await asyncio.get_running_loop().run_in_executor(None, policy, actions, horizon, params)
+        if name in self.sessions:
+            raise ValueError('session {!r} already exists'.format(name))
+        self.sessions[name] = learner
+        self._locks[name] = asyncio.Lock()
+
+    @staticmethod
+    def _vectorized(learner):
+        return type(learner).act_many.__func__ is not Learner.act_many.__func__
+
+    async def act(self, name):
+        learner = self._session(name)
+        loop = asyncio.get_running_loop()
+        if not self._vectorized(learner):
+            async with self._locks[name]:
+                action = await loop.run_in_executor(None, learner.act)
+            self.acts += 1
+            return self._action(learner, action)
+        future = loop.create_future()
+        self._pending.append((learner, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            if self.batch_delay > 0:
+                self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+
+        groups = {}
+        for learner, future in pending:
+            groups.setdefault((type(learner), getattr(learner, 'actions', None)), []).append((learner, future))
+
+        try:
+            for (policy, _), group in groups.items():
+                self.batches += 1
+                try:
+                    actions = policy.act_many([learner for learner, _ in group])
+                    if len(actions) != len(group):
+                        raise RuntimeError('{}.act_many returned {} actions for {} sessions'.format(
+                            policy.__name__, len(actions), len(group)))
+                except Exception as error:
+                    actions = [error] * len(group)
+                for (learner, future), action in zip(group, actions):
+                    if future.done(): # client went away
+                        continue
+                    if not isinstance(action, Exception):
+                        try:
+                            action = self._action(learner, action)
+                        except Exception as error:
+                            action = error
+                    if isinstance(action, Exception):
+                        future.set_exception(action)
+                    else:
+                        future.set_result(action)
+        finally:
+            # no future is left waiting, whatever failed above
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError('act failed'))
+            self.acts += len(pending)
+
+    @staticmethod
+    def _action(learner, action):
+        if action is None:
+            raise RuntimeError('{} returned no action'.format(type(learner).__name__))
+        action = int(action)
+        actions = getattr(learner, 'actions', None)
+        if action < 0 or (actions is not None and action >= actions):
+            raise RuntimeError('{} returned invalid action {}'.format(type(learner).__name__, action))
+        return action
+
+    async def handle(self, request):
+        op = request.get('op')
+        if op == 'act':
+            return {'action': await self.act(request['session'])}
+        if op in ('reward', 'rewards', 'reset', 'close'):
+            name = request['session']
+            learner = self._session(name)
+            # wait for a decision of this session running in the executor
+            async with self._locks[name]:
+                if op == 'reward':
+                    learner.update(int(request['action']), int(request['reward']))
+                elif op == 'rewards':
+                    learner.update_batch(
+                        [int(action) for action in request['actions']], [int(reward) for reward in request['rewards']])
+                elif op == 'reset':
+                    learner.reset()
+                elif self.sessions.get(name) is learner:
+                    del self.sessions[name]
+                    del self._locks[name]
+        elif op == 'create':
+            await self.create(request['session'], request['learner'], int(request['actions']),
+                int(request['horizon']), request.get('params'))
+        elif op == 'stats':
+            return {'sessions': len(self.sessions), 'acts': self.acts, 'batches': self.batches}
+        else:
+            raise ValueError('unknown op {!r}'.format(op))
+        return {'ok': True}
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = await self.handle(request)
+                except KeyError as error:
+                    response = {'error': 'missing field {}'.format(error)}
+                except Exception as error:
+                    response = {'error': str(error)}
+                if 'id' in request:
+                    response['id'] = request['id']
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, address):
+        '''Starts listening on `address` (see `parse_address`) and returns the asyncio server.'''
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            return await asyncio.start_unix_server(self._serve_client, path=target)
+        return await asyncio.start_server(self._serve_client, *target)
+
+    def run(self, address):
+        '''Serves on `address` until SIGINT or SIGTERM.'''
+        async def serve():
+            server = await self.start(address)
+            stopped = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in [signal.SIGINT, signal.SIGTERM]:
+                loop.add_signal_handler(signum, stopped.set)
+            async with server:
+                await stopped.wait()
+        try:
+            asyncio.run(serve())
+        finally:
+            kind, target = parse_address(address)
+            if kind == 'unix' and os.path.exists(target):
+                os.remove(target)
+
+
+class Client():
+    '''Sequential JSON-lines client of a DecisionServer.'''
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address):
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            reader, writer = await asyncio.open_unix_connection(target)
+        else:
+            reader, writer = await asyncio.open_connection(*target)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        self.writer.write(json.dumps(dict(fields, op=op)).encode() + b'\n')
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    async def act(self, session):
+        return (await self.request('act', session=session))['action']
+
+    async def reward(self, session, action, reward):
+        await self.request('reward', session=session, action=action, reward=reward)
+
+    async def rewards(self, session, actions, rewards):
+        await self.request('rewards', session=session, actions=actions, rewards=rewards)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def loadgen(address, learner='thompson', probs=(0.5, 0.6), sessions=100, steps=100,
+        concurrency=32, params=None, seed=None):
+    '''
+    Plays `sessions` sessions of `steps` decisions against a simulated
+    Bernoulli bandit with arm probabilities `probs`, over `concurrency`
+    connections, and returns the decision throughput and the percentiles
+    of act latency in milliseconds.
+    '''
+    rng = np.random.default_rng(seed)
+    probs = np.asarray(probs)
+    names = asyncio.Queue()
+    for i in range(sessions):
+        names.put_nowait('loadgen-{}-{}'.format(os.getpid(), i))
+    latencies = []
+
+    async def play():
+        client = await Client.connect(address)
+        try:
+            while not names.empty():
+                name = names.get_nowait()
+                await client.request('create', session=name, learner=learner, actions=len(probs),
+                    horizon=steps, params=params or {})
+                for _ in range(steps):
+                    start = time.perf_counter()
+                    action = await client.act(name)
+                    latencies.append(time.perf_counter() - start)
+                    await client.reward(name, action, int(rng.random() < probs[action]))
+                await client.request('close', session=name)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[play() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e3
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+    return {
+        'decisions': len(latencies),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed,
+        'p50': p50,
+        'p99': p99,
+        'p999': p999,
+    }
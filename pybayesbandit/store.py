@@ -0,0 +1,63 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import os
+
+
+class ArrayStore():
+    '''
+    Directory of NumPy arrays in .npy files, named by the caller.
+
+    Arrays are written once and loaded read-only through memory mapping, so
+    every process using the same store shares a single copy of each array.
+    They are written to a temporary file and renamed into place, so a
+    reader never sees a partial array. `create` memory-maps that temporary
+    file, for arrays that are filled in place and need not fit in memory.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def filename(self, name):
+        return os.path.join(self.path, name + '.npy')
+
+    def _tmp(self, name):
+        return '{}.{}.tmp'.format(self.filename(name), os.getpid())
+
+    def load(self, name, shape=None):
+        '''Returns the array `name` read-only, or None if it is missing or not of `shape`.'''
+        filename = self.filename(name)
+        if not os.path.exists(filename):
+            return None
+        array = np.load(filename, mmap_mode='r')
+        if shape is not None and array.shape != tuple(shape):
+            return None
+        return array
+
+    def create(self, name, shape, dtype):
+        '''Returns a writable array in a temporary file, to fill and then `save`.'''
+        return np.lib.format.open_memmap(self._tmp(name), mode='w+', dtype=dtype, shape=shape)
+
+    def save(self, name, array):
+        tmp = self._tmp(name)
+        if isinstance(array, np.memmap) and array.filename == os.path.abspath(tmp):
+            array.flush()
+        else:
+            with open(tmp, 'wb') as file:
+                np.save(file, array)
+        os.replace(tmp, self.filename(name))
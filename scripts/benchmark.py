@@ -12,135 +12,94 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
-# You should have received a copy of the GNU General Public License
-# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
 
 
-from pybayesbandit.bandits.bernoulli import BernoulliBandit
-from pybayesbandit.learners.random import RandomPolicy
-from pybayesbandit.learners.ucb import UCBPolicy
-from pybayesbandit.learners.thompson import ThompsonSamplingPolicy
-from pybayesbandit.learners.vi import BetaBernoulliVIPolicy
-from pybayesbandit.learners.uct import BetaBernoulliUCTPolicy
-from pybayesbandit.learners.lookahead import LookaheadTreeSearchPolicy
-from pybayesbandit.games.totalregret import TotalRegretGame
-from pybayesbandit.games.simpleregret import SimpleRegretGame
+from pybayesbandit.experiments import benchmark
 
-
-from collections import namedtuple
-import matplotlib.pyplot as plt
-import numpy as np
-import time
+import argparse
 import sys
 
 
-def plot_results(game_type, results, deltas, Ks, i, T):
-
-    fig.add_subplot(len(deltas), len(Ks), i)
-
-    if game_type == 'total':
-
-        rounds = range(1, T+1)
-        for name, (rewards, regrets) in results.items():
-            plt.plot(rounds, regrets[0], label=name)
-            # plt.fill_between(rounds, regrets[0] - regrets[1], regrets[0] + regrets[1], alpha=0.2)
-
-        plt.title('Cumulative Regret ($K={}, \\Delta={}$)'.format(K, delta), fontweight='bold')
-        plt.xlabel('rounds (t)')
-        plt.xticks(np.arange(1, 11, dtype=np.int32) * int(T / 10))
-        plt.legend()
-        plt.grid()
-        plt.tight_layout()
-
-    elif game_type == 'simple':
-
-        learners, regrets = list(results.keys()), list(results.values())
-        avg_regret = [r[0] for r in regrets]
-        std_regret = [r[1] for r in regrets]
-
-        opacity = 0.4
-        error_config = {'ecolor': '0.3'}
-
-        plt.bar(learners, avg_regret, 0.35,
-            alpha=opacity, color='b',
-            yerr=std_regret, error_kw=error_config)
-
-        plt.title('Simple Regret ($K={}, \\Delta={}$)'.format(K, delta), fontweight='bold')
-        plt.xlabel('learner')
-        plt.grid(axis='y')
-        plt.tight_layout()
-
-
-
-UCTParams = namedtuple('Params', 'trials maxdepth C')
-AOTreeParams = namedtuple('Params', 'maxdepth')
-
-policies = {
-    # 'Random': RandomPolicy,
-    'UCB1': UCBPolicy,
-    'TS': ThompsonSamplingPolicy,
-    # 'VI': BetaBernoulliVIPolicy,
-    'AOTree(depth=1)': (LookaheadTreeSearchPolicy, AOTreeParams(maxdepth=1)),
-    'AOTree(depth=2)': (LookaheadTreeSearchPolicy, AOTreeParams(maxdepth=2)),
-    'AOTree(depth=3)': (LookaheadTreeSearchPolicy, AOTreeParams(maxdepth=3)),
-    # 'AOTree(depth=4)': (LookaheadTreeSearchPolicy, AOTreeParams(maxdepth=4)),
-    # 'AOTree(depth=5)': (LookaheadTreeSearchPolicy, AOTreeParams(maxdepth=5))
-    # 'UCT(trials=64, depth=3, C=2)': (BetaBernoulliUCTPolicy, UCTParams(trials=64, maxdepth=3, C=2)),
-    # 'UCT(trials=64, depth=3, C=5)': (BetaBernoulliUCTPolicy, UCTParams(trials=64, maxdepth=3, C=5)),
-    'UCT(trials=64, depth=3, C=10)': (BetaBernoulliUCTPolicy, UCTParams(trials=64, maxdepth=3, C=10)),
-    # 'UCT(trials=256, depth=4, C=2)': (BetaBernoulliUCTPolicy, UCTParams(trials=256, maxdepth=4, C=2)),
-    # 'UCT(trials=256, depth=4, C=5)': (BetaBernoulliUCTPolicy, UCTParams(trials=256, maxdepth=4, C=5)),
-    'UCT(trials=256, depth=4, C=10)': (BetaBernoulliUCTPolicy, UCTParams(trials=256, maxdepth=4, C=10)),
-}
-
-games = {
-    'total': TotalRegretGame,
-    'simple': SimpleRegretGame
-}
-
-filename = sys.argv[1]
-game_type = sys.argv[2]
-
-N = 100
-T = 200
-
-Ks = [2]
-deltas = [0.15, 0.25, 0.35]
-
-fig = plt.figure(figsize=(20, 10))
-
-i = 1
-for delta in deltas:
-
-    for K in Ks:
-
-        probs = [0.5] * (K - 1) + [0.5 + delta]
-        bandit = BernoulliBandit(probs)
-
-        print('\n>> Bernoulli(K={}, delta={}) ...\n'.format(K, delta))
-
-        results = {}
-
-        for name, policy in policies.items():
-            print('{} is playing ... '.format(name), end='')
-
-            start = time.time()
-
-            if isinstance(policy, tuple):
-                learner = policy[0](bandit.size, T, policy[1])
-            else:
-                learner = policy(bandit.size, T)
-
-            game = games[game_type](bandit, learner)
-            results[name] = game.run(N, T)
-
-            end = time.time()
-            uptime = end - start
-            print('done in {:.4f} sec.'.format(uptime))
-
-        plot_results(game_type, results, deltas, Ks, i, T)
-
-        i += 1
-
-
-plt.savefig('{}.pdf'.format(filename), format='pdf')
+def parse_args():
+    description = 'Throughput, latency, memory and regret benchmarks of pybayesbandit learners.'
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '-l', '--learners',
+        nargs='+', type=str, choices=list(benchmark.PRESETS), default=list(benchmark.PRESETS),
+        metavar='LEARNER',
+        help='learners to benchmark (default=all): {}'.format(', '.join(benchmark.PRESETS))
+    )
+    parser.add_argument(
+        '-K',
+        nargs='+', type=int, default=[2],
+        help='numbers of arms (default=2)'
+    )
+    parser.add_argument(
+        '--deltas',
+        nargs='+', type=float, default=[0.15, 0.25, 0.35],
+        help='gaps between the best and the other arms (default=0.15 0.25 0.35)'
+    )
+    parser.add_argument(
+        '-hr', '--horizons',
+        nargs='+', type=int, default=[200],
+        help='numbers of timesteps in each episode (default=200)'
+    )
+    parser.add_argument(
+        '-e', '--episodes',
+        type=int, default=100,
+        help='number of episodes per scenario (default=100)'
+    )
+    parser.add_argument(
+        '-g', '--game',
+        type=str, metavar='{{{}}}'.format(','.join(benchmark.GAMES.builtins())), default='total',
+        help='game setting (default=total)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int, default=0,
+        help='random seed (default=0)'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str, default=None,
+        help='JSON file to write the results to'
+    )
+    parser.add_argument(
+        '-b', '--baseline',
+        type=str, default=None,
+        help='JSON results to compare against'
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float, default=0.1,
+        help='relative slowdown flagged as a regression (default=0.1)'
+    )
+    parser.add_argument(
+        '--plot',
+        type=str, default=None,
+        help='PDF file to plot the regret curves to'
+    )
+    args = parser.parse_args()
+    if args.game not in benchmark.GAMES:
+        parser.error('unknown game {!r} (choose from {})'.format(args.game, ', '.join(benchmark.GAMES.names())))
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    scenarios = benchmark.scenarios(args.learners, args.K, args.deltas, args.horizons, args.episodes, args.game)
+    results = benchmark.run(scenarios, seed=args.seed, verbose=True)
+
+    if args.output:
+        benchmark.save(results, args.output, seed=args.seed)
+    if args.plot:
+        benchmark.plot(results, args.plot)
+
+    if args.baseline:
+        regressions = benchmark.compare(results, benchmark.load(args.baseline), args.tolerance)
+        for name, metric, base, current in regressions:
+            print('REGRESSION {}: {} {:.4f} -> {:.4f}'.format(name, metric, base, current))
+        if regressions:
+            sys.exit(1)
+        print('No regressions against {}.'.format(args.baseline))
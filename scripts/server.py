@@ -0,0 +1,96 @@
+#! /usr/bin/env python3
+
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+
+
+from pybayesbandit import server
+
+import argparse
+import asyncio
+import json
+
+
+def parse_args():
+    description = 'JSON-lines decision server for pybayesbandit learners.'
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        'address',
+        type=str,
+        help='unix:PATH or HOST:PORT'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='serve learner sessions')
+    serve.add_argument(
+        '--batch-delay',
+        type=float, default=0.0, metavar='MS',
+        help='milliseconds to wait for more act requests to batch (default=0)'
+    )
+    serve.add_argument(
+        '--max-batch',
+        type=int, default=1024,
+        help='maximum number of act requests per batch (default=1024)'
+    )
+
+    loadgen = commands.add_parser('loadgen', help='measure the throughput and latency of a server')
+    loadgen.add_argument(
+        '-l', '--learner',
+        type=str, default='thompson',
+        help='learner type of the sessions (default=thompson)'
+    )
+    loadgen.add_argument(
+        '-p', '--params',
+        nargs='+', type=float, default=[0.5, 0.6],
+        help='simulated Bernoulli arm probabilities (default=0.5 0.6)'
+    )
+    loadgen.add_argument(
+        '-s', '--sessions',
+        type=int, default=100,
+        help='number of sessions (default=100)'
+    )
+    loadgen.add_argument(
+        '-n', '--steps',
+        type=int, default=100,
+        help='number of decisions per session (default=100)'
+    )
+    loadgen.add_argument(
+        '-c', '--concurrency',
+        type=int, default=32,
+        help='number of concurrent connections (default=32)'
+    )
+    loadgen.add_argument(
+        '--learner-params',
+        type=json.loads, default=None, metavar='JSON',
+        help='learner parameters as a JSON object, e.g. \'{"maxdepth": 2}\''
+    )
+    loadgen.add_argument(
+        '--seed',
+        type=int, default=None,
+        help='random seed of the simulated rewards'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.command == 'serve':
+        print('Serving on {} ...'.format(args.address))
+        server.DecisionServer(args.batch_delay / 1000, args.max_batch).run(args.address)
+
+    elif args.command == 'loadgen':
+        stats = asyncio.run(server.loadgen(args.address, args.learner, args.params, args.sessions,
+            args.steps, args.concurrency, args.learner_params, args.seed))
+        print('{decisions} decisions in {seconds:.3f} sec: {throughput:.1f} decisions/sec'.format(**stats))
+        print('act latency  p50 {p50:.3f} ms  p99 {p99:.3f} ms  p99.9 {p999:.3f} ms'.format(**stats))
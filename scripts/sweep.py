@@ -0,0 +1,57 @@
+#! /usr/bin/env python3
+
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+
+
+from pybayesbandit.experiments import sweep
+
+import argparse
+import json
+
+
+def parse_args():
+    description = 'Resumable sweeps of pybayesbandit experiments.'
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        'config',
+        type=str,
+        help='JSON sweep grid with "bandits", "learners", "games", "sizes" and "seed" keys'
+    )
+    parser.add_argument(
+        '-c', '--cache',
+        type=str, default='.sweep',
+        help='directory of cached job results (default=.sweep)'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int, default=1,
+        help='number of worker processes (default=1)'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str, default=None,
+        help='JSON file to write the jobs and their results to'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    jobs = sweep.load(args.config)
+    results = sweep.run(jobs, sweep.ResultCache(args.cache), workers=args.workers, verbose=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump([{'job': job._asdict(), 'result': result} for job, result in zip(jobs, results)], file)
@@ -0,0 +1,93 @@
+#! /usr/bin/env python3
+
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+
+
+from pybayesbandit.experiments import sweep
+from pybayesbandit.experiments import workqueue
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+
+
+def parse_args():
+    description = 'Shared-directory work queue for pybayesbandit sweeps.'
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        'queue',
+        type=str,
+        help='queue directory, shared by all nodes'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help='queue the jobs of a sweep grid')
+    submit.add_argument('config', type=str, help='JSON sweep grid (see scripts/sweep.py)')
+    submit.add_argument(
+        '-s', '--shards',
+        type=int, default=1,
+        help='number of episode shards per job (default=1)'
+    )
+
+    work = commands.add_parser('work', help='run queued shards')
+    work.add_argument(
+        '-w', '--workers',
+        type=int, default=1,
+        help='number of local worker processes (default=1)'
+    )
+    work.add_argument(
+        '--wait',
+        type=float, default=0.0,
+        help='seconds to wait for new shards before exiting (default=0)'
+    )
+    work.add_argument(
+        '--heartbeat',
+        type=float, default=60.0,
+        help='seconds between refreshes of a running shard (default=60)'
+    )
+
+    requeue = commands.add_parser('requeue', help='return stale running shards to the queue')
+    requeue.add_argument(
+        '--timeout',
+        type=float, default=3600.0,
+        help='seconds after which a running shard is stale (default=3600)'
+    )
+
+    commands.add_parser('status', help='count pending, running and done shards')
+
+    reduce = commands.add_parser('reduce', help='merge the shards of finished jobs')
+    reduce.add_argument('-o', '--output', type=str, required=True, help='JSON file to write the results to')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    queue = workqueue.WorkQueue(args.queue)
+
+    if args.command == 'submit':
+        print('{} shards submitted'.format(queue.submit(sweep.load(args.config), args.shards)))
+    elif args.command == 'work':
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(workqueue.work, args.queue, args.wait, 1.0, True, args.heartbeat) for _ in range(args.workers)]
+            print('{} shards done'.format(sum(future.result() for future in futures)))
+    elif args.command == 'requeue':
+        print('{} shards requeued'.format(queue.requeue(args.timeout)))
+    elif args.command == 'status':
+        print(queue.status())
+    elif args.command == 'reduce':
+        results = queue.reduce()
+        with open(args.output, 'w') as file:
+            json.dump([{'job': job._asdict(), 'result': result} for job, result in results], file)
+        print('{} jobs reduced'.format(len(results)))
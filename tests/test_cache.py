@@ -0,0 +1,47 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners.vi import ValueIteration
+from pybayesbandit.mdp.beta_bernoulli import make_mdp
+from pybayesbandit.search.cache import LayerCache
+
+import pytest
+
+
+@pytest.mark.parametrize('capacity', [2, 50, 400])
+def test_layer_cache_solves_like_a_dict(capacity):
+    mdp = make_mdp(2, 10)
+    expected = ValueIteration(mdp).V(mdp.start, 10)
+
+    cache = LayerCache(capacity)
+    solver = ValueIteration(mdp, cache=cache)
+    assert solver.V(mdp.start, 10) == pytest.approx(expected)
+    assert len(cache) <= capacity
+    assert cache.gap >= 1
+
+
+def test_layer_cache_keeps_dropped_layers_apart():
+    cache = LayerCache(4)
+    for steps in range(1, 5):
+        cache[(steps, 'a')] = steps
+        cache[(steps, 'b')] = steps
+    # dropping one layer of two entries at a time: 1 and then 3, never
+    # two adjacent layers while a non-adjacent one is left
+    assert len(cache) == 4
+    assert (1, 'a') not in cache and (3, 'a') not in cache
+    assert cache[(2, 'a')] == 2 and cache[(4, 'b')] == 4
+    cache[(1, 'a')] = 1
+    assert (1, 'a') not in cache
@@ -0,0 +1,70 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners.fleet import BanditFleet
+from pybayesbandit.learners.thompson import ThompsonSamplingPolicy
+from pybayesbandit.learners.ucb import UCBPolicy
+from pybayesbandit.rng import RandomSource
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('policy', BanditFleet.POLICIES)
+def test_update_batch_matches_updates(policy):
+    rng = np.random.default_rng(0)
+    ids = rng.integers(0, 20, size=500)
+    actions = rng.integers(0, 4, size=500)
+    rewards = rng.integers(0, 2, size=500)
+
+    batched = BanditFleet(20, 4, policy)
+    batched.update_batch(ids, actions, rewards)
+    sequential = BanditFleet(20, 4, policy)
+    for i, a, r in zip(ids, actions, rewards):
+        sequential.update(a, r, ids=[i])
+    np.testing.assert_array_equal(batched.successes, sequential.successes)
+    np.testing.assert_array_equal(batched.failures, sequential.failures)
+    assert batched.successes.sum() == rewards.sum()
+    assert (batched.successes + batched.failures).sum() == 500
+
+
+def test_ucb_initial_round_counts_pending_pulls():
+    fleet = BanditFleet(3, 4, 'ucb')
+    assert [fleet.act([1]).item() for _ in range(4)] == [0, 1, 2, 3]
+    assert fleet.pending.tolist() == [0, 4, 0]
+    assert fleet([0, 2]).tolist() == [0, 0]
+
+    fleet.update_batch([1, 1, 1, 1, 1], [0, 1, 2, 3, 3], [0, 0, 0, 1, 1])
+    assert fleet.pending.tolist() == [0, 0, 0]
+    assert fleet([1]).item() == 3
+
+    fleet.reset([1])
+    assert fleet([1]).item() == 0
+
+
+@pytest.mark.parametrize('learner', [ThompsonSamplingPolicy, UCBPolicy])
+def test_batch_is_a_fleet(learner):
+    if learner is ThompsonSamplingPolicy:
+        batch = learner(3, 10, rng=RandomSource(1)).batch(5)
+    else:
+        batch = learner(3, 10).batch(5)
+    assert isinstance(batch, BanditFleet) and len(batch) == 5
+    for _ in range(10):
+        actions = batch()
+        assert actions.shape == (5,)
+        batch.update(actions, np.ones(5))
+    assert (batch.successes.sum(axis=1) == 10).all()
+    assert not batch.pending.any()
@@ -0,0 +1,34 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners.gittins import GittinsIndexPolicy
+
+import types
+
+import pytest
+
+
+def test_default_discount_follows_the_horizon():
+    assert GittinsIndexPolicy(2, 100).discount == pytest.approx(0.99)
+    assert GittinsIndexPolicy(2, 100, types.SimpleNamespace(discount=None)).discount == pytest.approx(0.99)
+
+
+def test_zero_discount_is_greedy():
+    learner = GittinsIndexPolicy(2, 100, types.SimpleNamespace(discount=0.0))
+    assert learner.discount == 0.0
+    assert learner.index[3, 2] == pytest.approx(3 / 5)
+    learner.update_batch([0, 0, 1], [1, 0, 1])
+    assert learner() == 1
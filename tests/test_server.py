@@ -0,0 +1,149 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners import Learner
+from pybayesbandit.server import Client, DecisionServer
+
+import asyncio
+
+import pytest
+
+
+class NoAction(Learner):
+
+    actions = 2
+
+    def __call__(self):
+        return None
+
+    def update(self, action, reward):
+        pass
+
+    def reset(self):
+        pass
+
+
+class NoActions(NoAction):
+
+    @classmethod
+    def act_many(cls, learners):
+        return [None] * len(learners)
+
+
+def add(server, name, learner):
+    server.sessions[name] = learner
+    server._locks[name] = asyncio.Lock()
+
+
+def serve(tmp_path, play, **kwargs):
+    '''Runs `play(server, client)` against a server on a socket in tmp_path.'''
+    address = 'unix:' + str(tmp_path / 'server.sock')
+
+    async def main():
+        server = DecisionServer(**kwargs)
+        listener = await server.start(address)
+        async with listener:
+            client = await Client.connect(address)
+            try:
+                return await play(server, client)
+            finally:
+                await client.close()
+
+    return asyncio.run(main())
+
+
+def test_sessions_act_and_learn(tmp_path):
+    async def play(server, client):
+        for name in ['a', 'b', 'c']:
+            await client.request('create', session=name, learner='thompson', actions=3, horizon=10)
+        actions = await asyncio.gather(*[server.act(name) for name in ['a', 'b', 'c']])
+        assert all(action in range(3) for action in actions)
+        assert server.batches == 1
+
+        action = await client.act('a')
+        await client.reward('a', action, 1)
+        await client.rewards('b', [0, 1, 2], [1, 0, 1])
+        stats = await client.request('stats')
+        assert stats['sessions'] == 3 and stats['acts'] == 4
+
+        await client.request('close', session='c')
+        with pytest.raises(ValueError, match='unknown session'):
+            await client.act('c')
+
+    serve(tmp_path, play)
+
+
+def test_create_requires_a_horizon(tmp_path):
+    async def play(server, client):
+        with pytest.raises(ValueError, match='horizon'):
+            await client.request('create', session='a', learner='gittins', actions=2)
+        with pytest.raises(ValueError, match='horizon'):
+            await client.request('create', session='a', learner='thompson', actions=2, horizon=0)
+        await client.request('create', session='a', learner='gittins', actions=2, horizon=1)
+        assert await client.act('a') in (0, 1)
+
+    serve(tmp_path, play)
+
+
+def test_failed_actions_resolve_every_request(tmp_path):
+    async def play(server, client):
+        await client.request('create', session='a', learner='ucb', actions=2, horizon=10)
+        add(server, 'broken', NoActions())
+        add(server, 'searching', NoAction())
+        results = await asyncio.wait_for(asyncio.gather(
+            server.act('broken'), server.act('a'), server.act('broken'), server.act('searching'),
+            return_exceptions=True), 5)
+        assert all(isinstance(results[i], RuntimeError) for i in [0, 2, 3])
+        assert results[1] in (0, 1)
+        for name in ['broken', 'searching']:
+            with pytest.raises(ValueError, match='no action'):
+                await client.act(name)
+
+    serve(tmp_path, play)
+
+
+def test_session_past_its_horizon_fails_alone(tmp_path):
+    async def play(server, client):
+        for name in ['a', 'b']:
+            await client.request('create', session=name, learner='rollout', actions=2, horizon=1,
+                params={'trials': 4})
+        assert await client.act('a') in (0, 1)
+        results = await asyncio.gather(server.act('a'), server.act('b'), return_exceptions=True)
+        assert isinstance(results[0], ValueError) and 'no steps left' in str(results[0])
+        assert results[1] in (0, 1)
+
+    serve(tmp_path, play)
+
+
+def test_searches_do_not_hold_up_other_sessions(tmp_path):
+    async def play(server, client):
+        await client.request('create', session='search', learner='uct', actions=3, horizon=50,
+            params={'trials': 3000, 'maxdepth': 10, 'C': 1.0})
+        await client.request('create', session='fast', learner='thompson', actions=3, horizon=50)
+        search = asyncio.ensure_future(server.act('search'))
+        fast = await server.act('fast')
+        assert not search.done()
+        action = await search
+        assert fast in range(3) and action in range(3)
+
+        # requests of one session wait for its running decision
+        search = asyncio.ensure_future(server.act('search'))
+        await asyncio.sleep(0)
+        await server.handle({'op': 'reward', 'session': 'search', 'action': action, 'reward': 1})
+        assert search.done()
+        await search
+
+    serve(tmp_path, play)
@@ -0,0 +1,78 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.games.stats import QuantileSketch, RunningStats
+from pybayesbandit.games.totalregret import TotalRegretGame
+
+import numpy as np
+import pytest
+
+
+def test_running_stats_match_numpy():
+    x = np.random.default_rng(0).normal(3.0, 2.0, size=(1000, 7)).cumsum(axis=1)
+    stats = RunningStats((7,))
+    start = 0
+    for size in [1, 5, 100, 37, 1]:
+        stats.push(x[start:start + size])
+        start += size
+    for row in x[start:500]:
+        stats.push(row)
+
+    # the other half in two shards merged in
+    shards = [RunningStats((7,)), RunningStats((7,))]
+    shards[0].push(x[500:800])
+    shards[1].push(x[800:])
+    shards[0].merge(shards[1])
+    stats.merge(shards[0])
+    stats.merge(RunningStats((7,)))
+
+    assert stats.n == 1000
+    np.testing.assert_allclose(stats.mean, np.mean(x, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(stats.std, np.std(x, axis=0), rtol=1e-12)
+
+
+def test_accumulated_regrets_match_numpy():
+    rng = np.random.default_rng(1)
+    results = [(None, rng.integers(0, 2, size=(4, 20)), rng.random(size=(4, 20))) for _ in range(5)]
+    reward_stats, regret_stats, _ = TotalRegretGame.accumulate(results, 20)
+    rewards = np.concatenate([np.cumsum(r, axis=-1) for _, r, _ in results])
+    regrets = np.concatenate([np.cumsum(r, axis=-1) for _, _, r in results])
+    np.testing.assert_allclose(reward_stats.mean, np.mean(rewards, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(regret_stats.std, np.std(regrets, axis=0), rtol=1e-12)
+
+
+def test_quantile_sketch_is_exact_below_five_observations():
+    x = np.array([[3.0, 1.0], [1.0, 2.0], [2.0, 5.0]])
+    sketch = QuantileSketch([0.1, 0.5, 0.9], (2,))
+    sketch.push(x)
+    np.testing.assert_allclose(sketch.quantiles, np.quantile(x, [0.1, 0.5, 0.9], axis=0))
+
+
+@pytest.mark.parametrize('draw', [
+    lambda rng, size: rng.normal(size=size),
+    lambda rng, size: rng.exponential(size=size),
+    lambda rng, size: rng.integers(0, 50, size=size).astype(float),
+])
+def test_quantile_sketch_tracks_numpy(draw):
+    rng = np.random.default_rng(2)
+    x = draw(rng, (5000, 3))
+    probs = [0.05, 0.25, 0.5, 0.75, 0.95]
+    sketch = QuantileSketch(probs, (3,))
+    for chunk in np.array_split(x, 7):
+        sketch.push(chunk)
+    expected = np.quantile(x, probs, axis=0)
+    scale = np.quantile(x, 0.95, axis=0) - np.quantile(x, 0.05, axis=0)
+    assert np.all(np.abs(sketch.quantiles - expected) <= 0.02 * scale)
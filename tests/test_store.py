@@ -0,0 +1,54 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.registry import LEARNERS
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pickle
+import types
+
+import numpy as np
+
+
+def mapped(learner):
+    '''Returns the files behind a learner's table in this process, and its next action.'''
+    if hasattr(learner, 'index'):
+        arrays = [learner.index.table]
+    else:
+        arrays = [learner._V.policy, learner._V.values]
+    return [getattr(array, 'filename', None) for array in arrays], int(learner())
+
+
+def test_stored_tables_are_mapped_by_workers(tmp_path):
+    params = types.SimpleNamespace(solver='backward', store=str(tmp_path / 'vi'))
+    vi = LEARNERS['vi'](2, 20, params)
+    gittins = LEARNERS['gittins'](2, 40, types.SimpleNamespace(store=str(tmp_path / 'gittins')))
+    assert len(pickle.dumps(vi)) < 4096 and len(pickle.dumps(gittins)) < 4096
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        for learner in [vi, gittins]:
+            filenames, action = executor.submit(mapped, learner).result()
+            assert all(filename is not None and filename.startswith(str(tmp_path)) for filename in filenames)
+            assert action == learner()
+
+
+def test_unstored_tables_pickle_by_value():
+    vi = LEARNERS['vi'](2, 6, types.SimpleNamespace(solver='backward'))
+    copy = pickle.loads(pickle.dumps(vi))
+    np.testing.assert_array_equal(copy._V.values, vi._V.values)
+    assert copy._V.store is None
@@ -0,0 +1,110 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.registry import LEARNERS
+
+import types
+
+import numpy as np
+import pytest
+
+
+K, T = 3, 12
+
+PLANNERS = ['vi', 'uct', 'rollout', 'aotree']
+
+STATE = ['alphas', 'betas', 'avg', 'counts', 'n', '_belief', 'belief', '_T', '_step', 'horizon', '_pending']
+
+
+def make(name, **params):
+    params = dict(dict(trials=20, maxdepth=3, C=1.0, packed=True, reuse=True), **params)
+    return LEARNERS[name](K, T, types.SimpleNamespace(**params))
+
+
+def state(learner):
+    return {key: value for key, value in vars(learner).items() if key in STATE}
+
+
+def assert_same_state(a, b):
+    a, b = state(a), state(b)
+    assert a and a.keys() == b.keys()
+    for key in a:
+        np.testing.assert_allclose(np.asarray(a[key], dtype=float), np.asarray(b[key], dtype=float), err_msg=key)
+
+
+@pytest.mark.parametrize('name', ['thompson', 'ucb', 'gittins'] + PLANNERS)
+def test_update_batch_matches_updates(name):
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, K, 8).tolist()
+    rewards = rng.integers(0, 2, 8).tolist()
+    sequential, batched = make(name), make(name)
+    for action, reward in zip(actions, rewards):
+        sequential.update(action, reward)
+    batched.update_batch(actions, rewards)
+    assert_same_state(sequential, batched)
+
+
+@pytest.mark.parametrize('name', PLANNERS)
+def test_pending_actions_count_against_the_horizon(name):
+    learner = make(name)
+    actions = [learner.act() for _ in range(T)]
+    assert all(action in range(K) for action in actions)
+    with pytest.raises(ValueError, match='no steps left'):
+        learner.act()
+
+    learner.update_batch(actions[:5], [1] * 5)
+    with pytest.raises(ValueError, match='no steps left'):
+        learner.act()
+    learner.reset()
+    assert learner.act() in range(K)
+
+
+def test_ucb_initial_round_counts_pending_pulls():
+    learner = make('ucb')
+    assert [learner.act() for _ in range(K)] == [0, 1, 2]
+    learner.update_batch([0, 1, 2], [0, 1, 0])
+    assert learner._pending == 0 and learner() == 1
+
+    learners = [make('ucb'), make('ucb')]
+    learners[1].act()
+    assert LEARNERS['ucb'].act_many(learners).tolist() == [0, 1]
+    assert LEARNERS['ucb'].act_many(learners).tolist() == [1, 2]
+
+
+def test_backward_vi_rejects_pending_actions():
+    learner = make('vi', solver='backward', packed=False)
+    recursive = make('vi', packed=False)
+    action = learner.act()
+    assert action == recursive.act()
+    with pytest.raises(ValueError, match='backward solver'):
+        learner.act()
+    learner.update(action, 1)
+    recursive.update(action, 1)
+    assert learner.act() == recursive.act()
+
+
+@pytest.mark.parametrize('name', PLANNERS)
+def test_observations_beyond_the_horizon_are_rejected(name):
+    learner = make(name)
+    with pytest.raises(ValueError, match='exceed'):
+        learner.update_batch([0] * (T + 1), [1] * (T + 1))
+    assert_same_state(learner, make(name))
+
+    learner.update_batch([0] * (T - 1), [1] * (T - 1))
+    learner.act()
+    learner.update(0, 1)
+    with pytest.raises(ValueError, match='exceed'):
+        learner.update(0, 1)
@@ -0,0 +1,41 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.learners.vi import BackwardInduction, BetaBernoulliVIPolicy, ValueIteration
+from pybayesbandit.mdp.beta_bernoulli import make_mdp
+
+import types
+
+import pytest
+
+
+@pytest.mark.parametrize('K, T', [(1, 5), (2, 8), (3, 6)])
+@pytest.mark.parametrize('packed', [False, True])
+def test_backward_induction_matches_value_iteration(K, T, packed):
+    mdp = make_mdp(K, T, packed=packed)
+    recursive = ValueIteration(mdp)
+    table = recursive(T)
+    backward = BackwardInduction(mdp)
+    backward(T)
+    assert len(table) == sum(backward._V.sizes[:T])
+    for (steps, belief), (_, value) in table.items():
+        assert backward.V(belief, steps)[1] == pytest.approx(value, rel=1e-6)
+    assert backward.V(mdp.start, T)[0] == recursive.V(mdp.start, T)[0]
+
+
+def test_backward_solver_rejects_symmetric():
+    with pytest.raises(ValueError, match='symmetric'):
+        BetaBernoulliVIPolicy(2, 4, types.SimpleNamespace(solver='backward', symmetric=True))
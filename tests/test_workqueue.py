@@ -0,0 +1,83 @@
+# This file is part of pybayesbandit.
+
+# pybayesbandit is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pybayesbandit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pybayesbandit. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pybayesbandit.experiments import sweep
+from pybayesbandit.experiments import workqueue
+
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+
+def jobs():
+    return sweep.expand([[0.3, 0.6]], [('thompson', None), ('ucb', None)], ['total', 'simple'], [(12, 8)], seed=3)
+
+
+def test_workers_match_sequential_run(tmp_path):
+    queue = workqueue.WorkQueue(str(tmp_path))
+    assert queue.submit(jobs(), shards=4) == 16
+    assert queue.submit(jobs(), shards=4) == 0
+
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=workqueue.work, args=(str(tmp_path), 0.0, 0.1, False, 0.05)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(120)
+        assert worker.exitcode == 0
+
+    assert queue.status() == {'pending': 0, 'running': 0, 'done': 16}
+    results = queue.reduce()
+    assert len(results) == 4
+    for job, result in results:
+        expected = sweep.run_job(job)
+        for key, value in expected.items():
+            for stat in ['mean', 'std']:
+                np.testing.assert_allclose(result[key][stat], value[stat], rtol=1e-5, atol=1e-6)
+
+
+def test_requeued_claim_is_not_completed_by_its_old_owner(tmp_path):
+    queue = workqueue.WorkQueue(str(tmp_path))
+    queue.submit(jobs()[:1])
+    claim, descriptor = queue.claim()
+    assert queue.claim() is None
+    assert queue.submit(jobs()[:1]) == 0
+
+    assert queue.requeue(60) == 0
+    assert queue.heartbeat(claim)
+    time.sleep(0.05)
+    assert queue.requeue(0.01) == 1
+    assert not queue.heartbeat(claim)
+
+    new_claim, _ = queue.claim()
+    assert new_claim != claim
+    stats = workqueue.run_shard(descriptor)
+    assert not queue.complete(claim, stats)
+    assert queue.status() == {'pending': 0, 'running': 1, 'done': 0}
+    assert queue.complete(new_claim, stats)
+    assert queue.status() == {'pending': 0, 'running': 0, 'done': 1}
+    assert len(queue.reduce()) == 1
+
+
+def test_fresh_claims_are_not_requeued(tmp_path):
+    queue = workqueue.WorkQueue(str(tmp_path))
+    queue.submit(jobs()[:1])
+    claim, _ = queue.claim()
+    past = time.time() - 3600
+    os.utime(os.path.join(str(tmp_path), 'running', claim), (past, past))
+    assert queue.requeue(60) == 0